@@ -4,18 +4,22 @@ import pandas as pd
 import networkx as nx
 import os
 import pickle  # Adicione esta importação
+from .sensor_protocol import DecodificadorFrames, STATUS_NOMES
 
 class SensorIntegration:
-    def __init__(self, input_dir='src/data/', output_dir='src/data/'):
+    def __init__(self, input_dir='src/data/', output_dir='src/data/', historico=None):
         """Integração com sensores ESP32 para atualizar status das rotas.
         
         Args:
             input_dir (str): Diretório onde os dados de entrada estão armazenados.
             output_dir (str): Diretório onde os resultados serão salvos.
+            historico (SensorTimeSeries): Armazenamento opcional do histórico de leituras.
         """
         self.input_dir = input_dir
         self.output_dir = output_dir
         self.G = None
+        self.decodificador = DecodificadorFrames()
+        self.historico = historico
         
     def simular_dados_sensor(self):
         """Simula dados recebidos de um sensor ESP32.
@@ -77,7 +81,7 @@ class SensorIntegration:
                 
             rota = rotas_df.loc[rota_mask].iloc[0]
             
-            return {
+            dados_sensor = {
                 'rota_id': rota_id,
                 'origem': rota['origem'],
                 'destino': rota['destino'],
@@ -86,10 +90,70 @@ class SensorIntegration:
                 'nivel_bloqueio': int(partes[4]),
                 'timestamp': time.time()
             }
+            self.registrar_leitura(dados_sensor)
+            return dados_sensor
         except Exception as e:
             print(f"Erro ao processar dados seriais: {e}")
             return None
     
+    def processar_bytes_seriais(self, dados):
+        """Processa bytes recebidos do ESP32 no modo binário em lote.
+        
+        Args:
+            dados (bytes): Fragmento recebido da porta serial; frames incompletos
+                são mantidos até a próxima chamada.
+            
+        Returns:
+            list: Lista de dados processados, um dicionário por leitura
+        """
+        return self.processar_frames_binarios(self.decodificador.alimentar(dados))
+    
+    def processar_frames_binarios(self, frames):
+        """Converte frames binários decodificados em dados de sensor.
+        
+        Args:
+            frames (list): Tuplas (no_id, sequencia, leituras) de sensor_protocol.
+            
+        Returns:
+            list: Lista de dados processados no mesmo formato de processar_dados_seriais
+        """
+        if not frames:
+            return []
+        
+        # Um único carregamento de rotas por lote de frames
+        rotas_df = pd.read_csv(f'{self.input_dir}rotas.csv')
+        origens = rotas_df['origem'].tolist()
+        destinos = rotas_df['destino'].tolist()
+        agora = time.time()
+        
+        dados_processados = []
+        for _, _, leituras in frames:
+            for rota_id, status, agua, bloqueio, idade_ds in leituras.tolist():
+                if rota_id >= len(rotas_df) or status >= len(STATUS_NOMES):
+                    print(f"Leitura binária inválida para a rota ID {rota_id}")
+                    continue
+                dados_processados.append({
+                    'rota_id': rota_id,
+                    'origem': origens[rota_id],
+                    'destino': destinos[rota_id],
+                    'status': STATUS_NOMES[status],
+                    'nivel_agua': agua,
+                    'nivel_bloqueio': bloqueio,
+                    'timestamp': agora - idade_ds / 10
+                })
+                self.registrar_leitura(dados_processados[-1])
+        return dados_processados
+    
+    def registrar_leitura(self, dados_sensor):
+        """Registra a leitura no histórico de séries temporais, se configurado.
+        
+        Args:
+            dados_sensor (dict): Dados recebidos do sensor.
+        """
+        if self.historico is not None:
+            self.historico.registrar(dados_sensor['rota_id'], dados_sensor['timestamp'],
+                                     dados_sensor['nivel_agua'], dados_sensor['nivel_bloqueio'])
+    
     def atualizar_grafo(self, dados_sensor):
         """Atualiza o grafo da rede com base nos dados do sensor.
         
@@ -181,6 +245,7 @@ class SensorIntegration:
             # Simular dados do sensor
             dados_sensor = self.simular_dados_sensor()
             print(f"Dados do sensor: Rota {dados_sensor['origem']}-{dados_sensor['destino']} → {dados_sensor['status']}")
+            self.registrar_leitura(dados_sensor)
             
             # Atualizar o grafo
             self.atualizar_grafo(dados_sensor)
@@ -0,0 +1,472 @@
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import shutil
+import socket
+import tempfile
+import time
+import tty
+from collections import deque
+
+import numpy as np
+
+from .sensor_integration import SensorIntegration
+from .sensor_protocol import DecodificadorFrames, codificar_frame
+
+
+def classificar_status(nivel_agua, nivel_bloqueio):
+    """Classifica a rota com os mesmos limiares do firmware road_sensor.ino.
+
+    Args:
+        nivel_agua (int): Leitura analógica do sensor de nível de água (0-4095).
+        nivel_bloqueio (int): Leitura analógica do sensor de bloqueio (0-4095).
+
+    Returns:
+        str: Status da rota ('livre', 'parcial' ou 'bloqueada').
+    """
+    if nivel_bloqueio > 3000 or nivel_agua > 3500:
+        return 'bloqueada'
+    if nivel_bloqueio > 2000 or nivel_agua > 2000:
+        return 'parcial'
+    return 'livre'
+
+
+class SensorVirtual:
+    def __init__(self, sensor_id, rota_id, rng):
+        """Sensor ESP32 virtual com curvas de água e obstrução que derivam no tempo.
+
+        Args:
+            sensor_id (int): Identificador do sensor virtual.
+            rota_id (int): ID da rota monitorada (índice em rotas.csv).
+            rng (random.Random): Gerador aleatório usado pelo sensor.
+        """
+        self.sensor_id = sensor_id
+        self.rota_id = rota_id
+        self.rng = rng
+        self.nivel_agua = rng.uniform(0, 1500)
+        self.nivel_bloqueio = rng.uniform(0, 1000)
+        self.tendencia_agua = rng.gauss(0, 5)
+        self.sequencia = 0
+        self.pendentes = []
+
+    def proxima_leitura(self):
+        """Avança as curvas do sensor em uma leitura.
+
+        Returns:
+            tuple: (nivel_agua, nivel_bloqueio, status) da nova leitura.
+        """
+        rng = self.rng
+
+        # Água: passeio aleatório com tendência (chuva/escoamento) e reversão à média
+        if rng.random() < 0.02:
+            self.tendencia_agua = rng.gauss(0, 40)
+        self.nivel_agua += (self.tendencia_agua + rng.gauss(0, 25)
+                            - 0.01 * (self.nivel_agua - 1000))
+
+        # Obstrução: degraus raros (queda de árvore, deslizamento) e desobstrução gradual
+        if rng.random() < 0.005:
+            self.nivel_bloqueio += rng.uniform(1000, 3000)
+        else:
+            self.nivel_bloqueio += rng.gauss(0, 10) - 0.02 * self.nivel_bloqueio
+
+        self.nivel_agua = min(max(self.nivel_agua, 0), 4095)
+        self.nivel_bloqueio = min(max(self.nivel_bloqueio, 0), 4095)
+
+        agua = int(self.nivel_agua)
+        bloqueio = int(self.nivel_bloqueio)
+        return agua, bloqueio, classificar_status(agua, bloqueio)
+
+    def proxima_linha(self):
+        """Gera a próxima leitura no formato serial do ESP32.
+
+        Returns:
+            bytes: Linha DADOS_SENSOR:id:status:agua:bloqueio terminada em '\\n'.
+        """
+        agua, bloqueio, status = self.proxima_leitura()
+        return f"DADOS_SENSOR:{self.rota_id}:{status}:{agua}:{bloqueio}\n".encode()
+
+    def acumular_leitura(self, leituras_por_frame):
+        """Acumula uma leitura e gera um frame binário quando o lote está completo.
+
+        Args:
+            leituras_por_frame (int): Número de leituras agrupadas por frame.
+
+        Returns:
+            bytes: Frame binário com o lote, ou None se o lote ainda não está completo.
+        """
+        agua, bloqueio, status = self.proxima_leitura()
+        self.pendentes.append((agua, bloqueio, status, time.monotonic()))
+        if len(self.pendentes) < leituras_por_frame:
+            return None
+
+        agora = time.monotonic()
+        frame = codificar_frame(self.sensor_id & 0xFFFF, self.sequencia, [
+            (self.rota_id, status, agua, bloqueio, int((agora - instante) * 10))
+            for agua, bloqueio, status, instante in self.pendentes
+        ])
+        self.sequencia += 1
+        self.pendentes = []
+        return frame
+
+
+class _Endpoint:
+    """Canal serial virtual (pty ou socket) entre sensores e a ingestão."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        # Instantes de envio na ordem em que as linhas foram escritas no canal
+        self.enviados = deque()
+        self.extras = []
+
+
+class SensorLoadGenerator:
+    def __init__(self, input_dir='src/data/', output_dir='src/data/', num_sensores=1000,
+                 intervalo_segundos=5.0, jitter=0.2, prob_rajada=0.01, tamanho_rajada=5,
+                 num_endpoints=4, transporte='pty', protocolo='texto', leituras_por_frame=4,
+                 replanejar=False, callback_replanejamento=None, historico=None,
+                 silencioso=True, tempo_max_drenagem_segundos=30, semente=None):
+        """Gerador de carga que emula uma frota de sensores ESP32 para testes de estresse.
+
+        Cada sensor virtual escreve linhas DADOS_SENSOR em um dos endpoints
+        (pseudo-terminais ou sockets locais), que são lidos pela mesma rotina de
+        ingestão usada com o ESP32 real.
+
+        Args:
+            input_dir (str): Diretório onde os dados de entrada estão armazenados.
+            output_dir (str): Diretório onde os resultados serão salvos. Ao replanejar,
+                o grafo e rotas.csv são reescritos aqui; use uma cópia dos dados.
+            num_sensores (int): Número de sensores virtuais.
+            intervalo_segundos (float): Intervalo médio entre leituras de cada sensor
+                (o firmware usa 5 s).
+            jitter (float): Variação relativa aleatória do intervalo (0 a 1).
+            prob_rajada (float): Probabilidade de um ciclo emitir uma rajada de leituras.
+            tamanho_rajada (int): Número de leituras consecutivas em uma rajada.
+            num_endpoints (int): Número de canais seriais virtuais.
+            transporte (str): 'pty' para pseudo-terminais ou 'socket' para sockets locais.
+            protocolo (str): 'texto' para linhas DADOS_SENSOR ou 'binario' para frames em lote.
+            leituras_por_frame (int): Leituras agrupadas por frame no protocolo binário.
+            replanejar (bool): Se True, atualiza o grafo sempre que o status de uma rota muda.
+            callback_replanejamento (callable): Função chamada com os dados do sensor após
+                a atualização do grafo (por exemplo, recálculo do plano logístico).
+            historico (SensorTimeSeries): Histórico onde as leituras ingeridas são registradas.
+            silencioso (bool): Suprime as mensagens impressas pela ingestão durante o teste.
+            tempo_max_drenagem_segundos (float): Tempo máximo de espera, após o fim da
+                emissão, para a ingestão processar as leituras pendentes.
+            semente (int): Semente aleatória para reprodutibilidade.
+        """
+        if transporte not in ('pty', 'socket'):
+            raise ValueError(f"Transporte inválido: {transporte}")
+        if protocolo not in ('texto', 'binario'):
+            raise ValueError(f"Protocolo inválido: {protocolo}")
+
+        self.input_dir = input_dir
+        self.output_dir = output_dir
+        self.num_sensores = num_sensores
+        self.intervalo_segundos = intervalo_segundos
+        self.jitter = jitter
+        self.prob_rajada = prob_rajada
+        self.tamanho_rajada = tamanho_rajada
+        self.num_endpoints = num_endpoints
+        self.transporte = transporte
+        self.protocolo = protocolo
+        self.leituras_por_frame = leituras_por_frame
+        self.replanejar = replanejar
+        self.callback_replanejamento = callback_replanejamento
+        self.silencioso = silencioso
+        self.tempo_max_drenagem_segundos = tempo_max_drenagem_segundos
+        self.rng = random.Random(semente)
+        self.integracao = SensorIntegration(input_dir=input_dir, output_dir=output_dir,
+                                            historico=historico)
+
+    def _criar_sensores(self):
+        """Cria os sensores virtuais distribuídos entre as rotas existentes.
+
+        Returns:
+            list: Lista de SensorVirtual.
+        """
+        with open(f'{self.input_dir}rotas.csv') as f:
+            num_rotas = sum(1 for _ in f) - 1
+
+        return [
+            SensorVirtual(i, i % num_rotas, random.Random(self.rng.random()))
+            for i in range(self.num_sensores)
+        ]
+
+    async def _abrir_endpoint(self):
+        """Abre um canal serial virtual do transporte configurado.
+
+        Returns:
+            _Endpoint: Endpoint com leitor (lado da ingestão) e escritor (lado dos sensores).
+        """
+        loop = asyncio.get_running_loop()
+
+        if self.transporte == 'socket':
+            sock_sensor, sock_ingestao = socket.socketpair()
+            reader, writer_ingestao = await asyncio.open_connection(sock=sock_ingestao)
+            _, writer = await asyncio.open_connection(sock=sock_sensor)
+            endpoint = _Endpoint(reader, writer)
+            # Mantém a ponta de ingestão aberta até o fim do teste
+            endpoint.extras.append(writer_ingestao)
+            return endpoint
+
+        # Pseudo-terminal em modo raw, como uma porta serial USB do ESP32
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader),
+                                     os.fdopen(slave, 'rb', 0))
+        transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin,
+                                                            os.fdopen(master, 'wb', 0))
+        writer = asyncio.StreamWriter(transport, protocol, None, loop)
+        return _Endpoint(reader, writer)
+
+    async def _emitir(self, sensor, endpoint):
+        """Loop de emissão de um sensor virtual."""
+        # Defasagem inicial para que os sensores não disparem todos juntos
+        await asyncio.sleep(sensor.rng.uniform(0, self.intervalo_segundos))
+
+        while True:
+            n = self.tamanho_rajada if sensor.rng.random() < self.prob_rajada else 1
+            for _ in range(n):
+                if self.protocolo == 'texto':
+                    endpoint.enviados.append(time.perf_counter())
+                    endpoint.writer.write(sensor.proxima_linha())
+                    self.enviadas += 1
+                    continue
+
+                frame = sensor.acumular_leitura(self.leituras_por_frame)
+                if frame is not None:
+                    endpoint.enviados.append(time.perf_counter())
+                    endpoint.writer.write(frame)
+                    self.enviadas += self.leituras_por_frame
+            await endpoint.writer.drain()
+
+            variacao = 1 + self.jitter * sensor.rng.uniform(-1, 1)
+            await asyncio.sleep(self.intervalo_segundos * variacao)
+
+    def _aplicar_leitura(self, dados, t_envio):
+        """Aplica o replanejamento a uma leitura processada e registra a latência."""
+        if self.replanejar and self.ultimo_status.get(dados['rota_id']) != dados['status']:
+            self.ultimo_status[dados['rota_id']] = dados['status']
+            self.integracao.atualizar_grafo(dados)
+            if self.callback_replanejamento is not None:
+                self.callback_replanejamento(dados)
+            self.latencias_replanejamento.append(time.perf_counter() - t_envio)
+
+        self.latencias.append(time.perf_counter() - t_envio)
+
+    async def _ingerir(self, endpoint):
+        """Loop de ingestão: processa as linhas como chegariam da porta serial."""
+        while True:
+            linha = await endpoint.reader.readline()
+            if not linha:
+                break
+            t_envio = endpoint.enviados.popleft()
+            self.bytes_recebidos += len(linha)
+
+            dados = self.integracao.processar_dados_seriais(linha.decode())
+            if dados is None:
+                self.invalidas += 1
+                continue
+            self._aplicar_leitura(dados, t_envio)
+
+    async def _ingerir_binario(self, endpoint):
+        """Loop de ingestão de frames binários recebidos em fragmentos."""
+        decodificador = DecodificadorFrames()
+        while True:
+            fragmento = await endpoint.reader.read(65536)
+            if not fragmento:
+                break
+            self.bytes_recebidos += len(fragmento)
+
+            for frame in decodificador.alimentar(fragmento):
+                t_envio = endpoint.enviados.popleft()
+                leituras = self.integracao.processar_frames_binarios([frame])
+                self.invalidas += len(frame[2]) - len(leituras)
+                for dados in leituras:
+                    self._aplicar_leitura(dados, t_envio)
+
+    async def _executar(self, duracao_segundos):
+        """Executa o teste de carga dentro do loop asyncio."""
+        self.enviadas = 0
+        self.invalidas = 0
+        self.bytes_recebidos = 0
+        self.latencias = []
+        self.latencias_replanejamento = []
+        self.ultimo_status = {}
+
+        sensores = self._criar_sensores()
+        endpoints = [await self._abrir_endpoint() for _ in range(self.num_endpoints)]
+
+        inicio = time.perf_counter()
+        ingerir = self._ingerir if self.protocolo == 'texto' else self._ingerir_binario
+        consumidores = [asyncio.create_task(ingerir(ep)) for ep in endpoints]
+        produtores = [
+            asyncio.create_task(self._emitir(s, endpoints[i % len(endpoints)]))
+            for i, s in enumerate(sensores)
+        ]
+
+        try:
+            # Uma falha na ingestão encerra o teste imediatamente
+            await asyncio.wait(consumidores, timeout=duracao_segundos,
+                               return_when=asyncio.FIRST_COMPLETED)
+            self._verificar_consumidores(consumidores)
+            for tarefa in produtores:
+                tarefa.cancel()
+            await asyncio.gather(*produtores, return_exceptions=True)
+
+            # Aguarda a ingestão esvaziar as filas antes de encerrar os canais
+            limite = time.perf_counter() + self.tempo_max_drenagem_segundos
+            while any(ep.enviados for ep in endpoints):
+                self._verificar_consumidores(consumidores)
+                if time.perf_counter() > limite:
+                    raise TimeoutError(
+                        f"Ingestão não processou {sum(len(ep.enviados) for ep in endpoints)} "
+                        f"leituras em {self.tempo_max_drenagem_segundos}s após o fim da emissão")
+                await asyncio.sleep(0.05)
+            duracao_real = time.perf_counter() - inicio
+        finally:
+            for tarefa in produtores + consumidores:
+                tarefa.cancel()
+            await asyncio.gather(*produtores, *consumidores, return_exceptions=True)
+            for ep in endpoints:
+                for writer in [ep.writer] + ep.extras:
+                    writer.close()
+
+        return self._gerar_relatorio(duracao_real)
+
+    def _verificar_consumidores(self, consumidores):
+        """Propaga a exceção de uma tarefa de ingestão que terminou com erro."""
+        for tarefa in consumidores:
+            if tarefa.done() and not tarefa.cancelled() and tarefa.exception() is not None:
+                raise tarefa.exception()
+
+    def _gerar_relatorio(self, duracao):
+        """Consolida vazão e percentis de latência do teste.
+
+        Args:
+            duracao (float): Duração total do teste em segundos.
+
+        Returns:
+            dict: Métricas do teste de carga.
+        """
+        def percentis(amostras):
+            if not amostras:
+                return {'p50': None, 'p95': None, 'p99': None, 'max': None}
+            p50, p95, p99, pmax = np.percentile(np.array(amostras) * 1000, [50, 95, 99, 100])
+            return {'p50': p50, 'p95': p95, 'p99': p99, 'max': pmax}
+
+        processadas = len(self.latencias) + self.invalidas
+        return {
+            'sensores': self.num_sensores,
+            'transporte': self.transporte,
+            'protocolo': self.protocolo,
+            'duracao_s': duracao,
+            'leituras_enviadas': self.enviadas,
+            'leituras_processadas': processadas,
+            'leituras_invalidas': self.invalidas,
+            'bytes_por_leitura': self.bytes_recebidos / processadas if processadas else None,
+            'vazao_leituras_s': processadas / duracao if duracao > 0 else 0.0,
+            'latencia_ms': percentis(self.latencias),
+            'replanejamentos': len(self.latencias_replanejamento),
+            'latencia_replanejamento_ms': percentis(self.latencias_replanejamento),
+        }
+
+    def executar(self, duracao_segundos=30):
+        """Executa o teste de carga e exibe o relatório.
+
+        Args:
+            duracao_segundos (float): Tempo durante o qual os sensores emitem leituras.
+
+        Returns:
+            dict: Métricas de vazão e latência da ingestão.
+        """
+        print(f"Iniciando teste de carga com {self.num_sensores} sensores virtuais "
+              f"em {self.num_endpoints} endpoints ({self.transporte}, {self.protocolo}) por {duracao_segundos}s...")
+
+        with contextlib.ExitStack() as stack:
+            if self.silencioso:
+                devnull = stack.enter_context(open(os.devnull, 'w'))
+                stack.enter_context(contextlib.redirect_stdout(devnull))
+            relatorio = asyncio.run(self._executar(duracao_segundos))
+
+        self.exibir_relatorio(relatorio)
+        return relatorio
+
+    def exibir_relatorio(self, relatorio):
+        """Exibe um resumo do teste de carga.
+
+        Args:
+            relatorio (dict): Métricas retornadas por executar().
+        """
+        def formatar(p):
+            if p['p50'] is None:
+                return "sem amostras"
+            return f"p50 {p['p50']:.2f} ms, p95 {p['p95']:.2f} ms, p99 {p['p99']:.2f} ms, máx {p['max']:.2f} ms"
+
+        print("\nResultado do teste de carga:")
+        print(f"  Leituras enviadas: {relatorio['leituras_enviadas']}")
+        print(f"  Leituras processadas: {relatorio['leituras_processadas']} "
+              f"({relatorio['leituras_invalidas']} inválidas)")
+        print(f"  Vazão: {relatorio['vazao_leituras_s']:.1f} leituras/s")
+        if relatorio['bytes_por_leitura'] is not None:
+            print(f"  Bytes por leitura ({relatorio['protocolo']}): {relatorio['bytes_por_leitura']:.1f}")
+        print(f"  Latência de ingestão: {formatar(relatorio['latencia_ms'])}")
+        if self.replanejar:
+            print(f"  Replanejamentos: {relatorio['replanejamentos']}")
+            print(f"  Latência até replanejamento: {formatar(relatorio['latencia_replanejamento_ms'])}")
+
+
+# Exemplo de uso
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Gerador de carga de sensores ESP32 virtuais')
+    parser.add_argument('--sensores', type=int, default=1000, help='Número de sensores virtuais')
+    parser.add_argument('--intervalo', type=float, default=5.0, help='Intervalo entre leituras (s)')
+    parser.add_argument('--duracao', type=float, default=30, help='Duração do teste (s)')
+    parser.add_argument('--endpoints', type=int, default=4, help='Número de canais seriais virtuais')
+    parser.add_argument('--transporte', choices=['pty', 'socket'], default='pty')
+    parser.add_argument('--protocolo', choices=['texto', 'binario'], default='texto')
+    parser.add_argument('--leituras-por-frame', type=int, default=4, help='Leituras por frame binário')
+    parser.add_argument('--prob-rajada', type=float, default=0.01, help='Probabilidade de rajada por ciclo')
+    parser.add_argument('--tamanho-rajada', type=int, default=5, help='Leituras por rajada')
+    parser.add_argument('--replanejar', action='store_true',
+                        help='Atualizar o grafo a cada mudança de status e replanejar as entregas em bloqueios')
+    parser.add_argument('--dados', default=None,
+                        help='Diretório dos dados de entrada/saída (padrão: cópia temporária de src/data/)')
+    args = parser.parse_args()
+
+    dados = args.dados
+    if dados is None:
+        # O replanejamento reescreve a rede e rotas.csv: os dados do repositório ficam intactos
+        dados = tempfile.mkdtemp(prefix='carga_sensores_') + '/'
+        shutil.copytree('src/data/', dados, dirs_exist_ok=True,
+                        ignore=shutil.ignore_patterns('historico', 'matrizes'))
+        print(f"Usando cópia temporária dos dados em {dados}")
+
+    callback_replanejamento = None
+    if args.replanejar:
+        from ..models.resource_allocator import ResourceAllocator
+
+        alocador = ResourceAllocator(input_dir=dados, output_dir=dados)
+        alocador.alocar_recursos()
+
+        def callback_replanejamento(dados_sensor):
+            # Promove as alternativas pré-calculadas; a reotimização completa segue em segundo plano
+            if dados_sensor['status'] == 'bloqueada':
+                alocador.aplicar_bloqueio(f"A{dados_sensor['origem']}", f"A{dados_sensor['destino']}")
+
+    gerador = SensorLoadGenerator(input_dir=dados, output_dir=dados,
+                                  num_sensores=args.sensores,
+                                  intervalo_segundos=args.intervalo,
+                                  prob_rajada=args.prob_rajada,
+                                  tamanho_rajada=args.tamanho_rajada,
+                                  num_endpoints=args.endpoints,
+                                  transporte=args.transporte,
+                                  protocolo=args.protocolo,
+                                  leituras_por_frame=args.leituras_por_frame,
+                                  replanejar=args.replanejar,
+                                  callback_replanejamento=callback_replanejamento)
+    gerador.executar(duracao_segundos=args.duracao)
@@ -0,0 +1,186 @@
+import struct
+import zlib
+
+import numpy as np
+
+# Protocolo binário em lote dos sensores ESP32 (little-endian, campos de largura fixa)
+#
+# Cabeçalho (10 bytes): magic 0xD5 0x5E | versão u8 | nº de leituras u8 | id do nó u16 | sequência u32
+# Leitura (9 bytes):    rota_id u16 | status u8 | nível de água u16 | nível de bloqueio u16 | idade u16 (décimos de s)
+# Rodapé (4 bytes):     CRC32 (zlib) do cabeçalho e das leituras
+MAGIC = b'\xd5\x5e'
+VERSAO = 1
+MAX_LEITURAS_POR_FRAME = 255
+
+CABECALHO = struct.Struct('<2sBBHI')
+LEITURA = struct.Struct('<HBHHH')
+CRC = struct.Struct('<I')
+
+# Layout equivalente a LEITURA para decodificação sem cópia com numpy
+DTYPE_LEITURA = np.dtype([
+    ('rota_id', '<u2'),
+    ('status', 'u1'),
+    ('nivel_agua', '<u2'),
+    ('nivel_bloqueio', '<u2'),
+    ('idade_ds', '<u2'),
+])
+
+STATUS_CODIGOS = {'livre': 0, 'parcial': 1, 'bloqueada': 2}
+STATUS_NOMES = ('livre', 'parcial', 'bloqueada')
+
+
+def codificar_frame(no_id, sequencia, leituras):
+    """Codifica um lote de leituras em um frame binário.
+
+    Args:
+        no_id (int): Identificador do nó sensor que emite o frame.
+        sequencia (int): Número de sequência do frame (módulo 2**32).
+        leituras (list): Tuplas (rota_id, status, nivel_agua, nivel_bloqueio, idade_ds),
+            com status como texto ('livre', 'parcial', 'bloqueada') ou código numérico.
+
+    Returns:
+        bytes: Frame pronto para transmissão.
+    """
+    if not 0 < len(leituras) <= MAX_LEITURAS_POR_FRAME:
+        raise ValueError(f"Um frame deve conter entre 1 e {MAX_LEITURAS_POR_FRAME} leituras")
+
+    tamanho = CABECALHO.size + LEITURA.size * len(leituras)
+    frame = bytearray(tamanho + CRC.size)
+    CABECALHO.pack_into(frame, 0, MAGIC, VERSAO, len(leituras), no_id, sequencia & 0xFFFFFFFF)
+
+    pos = CABECALHO.size
+    for rota_id, status, agua, bloqueio, idade_ds in leituras:
+        if isinstance(status, str):
+            status = STATUS_CODIGOS[status]
+        LEITURA.pack_into(frame, pos, rota_id, status, agua, bloqueio, min(idade_ds, 0xFFFF))
+        pos += LEITURA.size
+
+    CRC.pack_into(frame, tamanho, zlib.crc32(memoryview(frame)[:tamanho]))
+    return bytes(frame)
+
+
+def decodificar_buffer(buffer, inicio=0, fim=None):
+    """Decodifica todos os frames completos de um trecho de um buffer.
+
+    As leituras de cada frame são arrays numpy estruturados (DTYPE_LEITURA) que
+    apontam diretamente para a memória do buffer, sem cópia. Bytes que não
+    formam um frame válido (ruído, texto de depuração, CRC incorreto) são
+    descartados até o próximo marcador de início.
+
+    Args:
+        buffer (bytes | bytearray): Dados recebidos da porta serial ou do rádio.
+        inicio (int): Posição do primeiro byte a decodificar.
+        fim (int): Posição após o último byte válido (padrão: fim do buffer).
+
+    Returns:
+        tuple: (frames, consumidos, descartados), onde frames é uma lista de
+            tuplas (no_id, sequencia, leituras), consumidos é o número de bytes
+            processados a partir de inicio e descartados o número de frames
+            rejeitados por CRC ou versão inválidos.
+    """
+    mv = memoryview(buffer)
+    total = len(mv) if fim is None else fim
+    frames = []
+    descartados = 0
+    pos = inicio
+
+    while total - pos >= CABECALHO.size + CRC.size:
+        if mv[pos:pos + 2] != MAGIC:
+            proximo = buffer.find(MAGIC, pos + 1, total)
+            if proximo < 0:
+                # Mantém o último byte, que pode ser o início de um marcador
+                pos = max(total - 1, pos)
+                break
+            pos = proximo
+            continue
+
+        _, versao, n, no_id, sequencia = CABECALHO.unpack_from(mv, pos)
+        tamanho = CABECALHO.size + LEITURA.size * n
+        if versao != VERSAO or n == 0:
+            descartados += 1
+            pos += 1
+            continue
+        if total - pos < tamanho + CRC.size:
+            break  # Frame incompleto; aguarda mais dados
+
+        (crc,) = CRC.unpack_from(mv, pos + tamanho)
+        if zlib.crc32(mv[pos:pos + tamanho]) != crc:
+            descartados += 1
+            pos += 1
+            continue
+
+        leituras = np.frombuffer(mv, dtype=DTYPE_LEITURA, count=n, offset=pos + CABECALHO.size)
+        frames.append((no_id, sequencia, leituras))
+        pos += tamanho + CRC.size
+
+    return frames, pos - inicio, descartados
+
+
+class DecodificadorFrames:
+    def __init__(self, capacidade=4096):
+        """Decodificador incremental de frames binários recebidos em fragmentos.
+
+        Os bytes de frames ainda incompletos ficam em um bytearray pré-alocado,
+        com posições de leitura e escrita, e são decodificados no próprio buffer.
+        Bytes já gravados nunca são sobrescritos: quando o espaço livre acaba,
+        apenas os pendentes são movidos para um buffer novo e o anterior
+        continua válido para as leituras já entregues, que o referenciam sem
+        cópia. Também acompanha a sequência de
+        cada nó para contabilizar frames perdidos.
+
+        Args:
+            capacidade (int): Tamanho inicial do buffer de recepção, em bytes.
+        """
+        self._buffer = bytearray(capacidade)
+        self._inicio = 0
+        self._fim = 0
+        self.ultima_sequencia = {}
+        self.frames_descartados = 0
+        self.frames_perdidos = 0
+
+    def _reservar(self, tamanho):
+        """Garante espaço para mais 'tamanho' bytes após os dados pendentes."""
+        if self._fim + tamanho <= len(self._buffer):
+            return
+        pendente = self._fim - self._inicio
+        # Buffer novo em vez de redimensionar: leituras entregues ainda apontam para o atual
+        novo = bytearray(max(len(self._buffer), 2 * (pendente + tamanho)))
+        novo[:pendente] = memoryview(self._buffer)[self._inicio:self._fim]
+        self._buffer = novo
+        self._inicio = 0
+        self._fim = pendente
+
+    def alimentar(self, dados):
+        """Acrescenta bytes recebidos e retorna os frames completos.
+
+        Args:
+            dados (bytes): Fragmento recebido do canal serial.
+
+        Returns:
+            list: Tuplas (no_id, sequencia, leituras) dos frames decodificados.
+        """
+        tamanho = len(dados)
+        if self._inicio == self._fim:
+            # Nada pendente: decodifica direto do fragmento e guarda apenas o resto incompleto
+            frames, consumidos, descartados = decodificar_buffer(dados)
+            restante = tamanho - consumidos
+            self._reservar(restante)
+            self._buffer[self._fim:self._fim + restante] = memoryview(dados)[consumidos:]
+            self._fim += restante
+        else:
+            self._reservar(tamanho)
+            self._buffer[self._fim:self._fim + tamanho] = dados
+            self._fim += tamanho
+            frames, consumidos, descartados = decodificar_buffer(self._buffer, self._inicio, self._fim)
+            self._inicio += consumidos
+        self.frames_descartados += descartados
+
+        for no_id, sequencia, _ in frames:
+            anterior = self.ultima_sequencia.get(no_id)
+            if anterior is not None:
+                salto = (sequencia - anterior) & 0xFFFFFFFF
+                if 1 < salto < 0x80000000:
+                    self.frames_perdidos += salto - 1
+            self.ultima_sequencia[no_id] = sequencia
+
+        return frames
@@ -0,0 +1,268 @@
+import math
+import os
+
+import numpy as np
+
+# Campos de cada amostra bruta e de cada agregado (rollup)
+CAMPOS_BRUTOS = ('timestamp', 'nivel_agua', 'nivel_bloqueio')
+CAMPOS_ROLLUP = ('inicio', 'agua_min', 'agua_max', 'agua_media',
+                 'bloqueio_min', 'bloqueio_max', 'bloqueio_media')
+
+# Períodos dos agregados automáticos em segundos
+PERIODOS_ROLLUP = {'1min': 60, '15min': 900, '1h': 3600}
+
+
+class _AnelRotas:
+    """Buffers circulares de tamanho fixo, uma linha por rota.
+
+    Quando um bloco de registros antigos está para ser sobrescrito, ele é
+    gravado em disco (anexado a um arquivo binário por rota).
+    """
+
+    def __init__(self, nome, num_campos, capacidade, bloco, diretorio):
+        self.nome = nome
+        self.capacidade = capacidade
+        self.bloco = bloco
+        self.diretorio = diretorio
+        self.dados = np.full((0, capacidade, num_campos), np.nan)
+        self.contagem = np.zeros(0, dtype=np.int64)
+
+    def crescer(self, num_linhas):
+        extra = num_linhas - len(self.contagem)
+        self.dados = np.concatenate(
+            [self.dados, np.full((extra,) + self.dados.shape[1:], np.nan)])
+        self.contagem = np.concatenate([self.contagem, np.zeros(extra, dtype=np.int64)])
+
+    def caminho(self, rota_id):
+        return os.path.join(self.diretorio, f'{self.nome}_rota_{rota_id}.bin')
+
+    def anexar(self, linha, rota_id, registro):
+        n = self.contagem[linha]
+        pos = n % self.capacidade
+        if n >= self.capacidade and pos % self.bloco == 0:
+            # Bloco mais antigo será sobrescrito: grava em disco antes
+            os.makedirs(self.diretorio, exist_ok=True)
+            with open(self.caminho(rota_id), 'ab') as f:
+                self.dados[linha, pos:pos + self.bloco].tofile(f)
+        self.dados[linha, pos] = registro
+        self.contagem[linha] = n + 1
+
+    def ordenados(self, linha):
+        """Registros da linha em ordem cronológica (cópia)."""
+        n = self.contagem[linha]
+        if n <= self.capacidade:
+            return self.dados[linha, :n].copy()
+        pos = n % self.capacidade
+        return np.concatenate([self.dados[linha, pos:], self.dados[linha, :pos]])
+
+
+class SensorTimeSeries:
+    def __init__(self, output_dir='src/data/historico/', capacidade=1024,
+                 capacidade_rollup=512, meia_vida_taxa_segundos=300):
+        """Armazenamento em memória do histórico de leituras dos sensores por rota.
+
+        As leituras brutas ficam em buffers circulares NumPy de tamanho fixo e são
+        agregadas automaticamente em janelas de 1 min, 15 min e 1 h (mínimo,
+        máximo e média). Dados que saem dos buffers são gravados em disco, de modo
+        que a memória usada não cresce com a duração da execução.
+
+        Args:
+            output_dir (str): Diretório onde os dados antigos são gravados.
+            capacidade (int): Número de leituras brutas mantidas em memória por rota.
+            capacidade_rollup (int): Número de agregados mantidos em memória por rota e período.
+            meia_vida_taxa_segundos (float): Meia-vida da média móvel da taxa de
+                variação do nível de água usada no ranking de subida.
+        """
+        self.output_dir = output_dir
+        self.tau_taxa = meia_vida_taxa_segundos / math.log(2)
+        self.brutos = _AnelRotas('brutos', len(CAMPOS_BRUTOS), capacidade,
+                                 max(capacidade // 4, 1), output_dir)
+        self.rollups = {
+            nome: _AnelRotas(f'rollup_{nome}', len(CAMPOS_ROLLUP), capacidade_rollup,
+                             max(capacidade_rollup // 4, 1), output_dir)
+            for nome in PERIODOS_ROLLUP
+        }
+
+        self.linhas = {}  # rota_id -> linha nos buffers
+        self.rota_ids = np.zeros(0, dtype=np.int64)
+
+        # Estado incremental por rota
+        self.ultimo = np.full((0, len(CAMPOS_BRUTOS)), np.nan)
+        self.taxa_agua = np.zeros(0)  # Unidades do sensor por minuto
+        # Agregados em aberto: [janela, agua_min, agua_max, agua_soma, bloq_min, bloq_max, bloq_soma, n]
+        self.abertos = {nome: np.zeros((0, 8)) for nome in PERIODOS_ROLLUP}
+        # Leituras fora de ordem (timestamp anterior à última leitura da rota)
+        self.leituras_atrasadas = 0
+
+    def _linha(self, rota_id):
+        """Retorna a linha dos buffers da rota, alocando espaço para rotas novas."""
+        linha = self.linhas.get(rota_id)
+        if linha is not None:
+            return linha
+
+        linha = len(self.linhas)
+        self.linhas[rota_id] = linha
+        if linha >= len(self.rota_ids):
+            # Crescimento geométrico: o número de rotas é limitado pela rede
+            novo_total = max(2 * len(self.rota_ids), 16)
+            extra = novo_total - len(self.rota_ids)
+            self.brutos.crescer(novo_total)
+            for anel in self.rollups.values():
+                anel.crescer(novo_total)
+            self.rota_ids = np.concatenate([self.rota_ids, np.full(extra, -1)])
+            self.ultimo = np.concatenate([self.ultimo, np.full((extra, len(CAMPOS_BRUTOS)), np.nan)])
+            self.taxa_agua = np.concatenate([self.taxa_agua, np.zeros(extra)])
+            for nome in self.abertos:
+                self.abertos[nome] = np.concatenate([self.abertos[nome], np.zeros((extra, 8))])
+        self.rota_ids[linha] = rota_id
+        return linha
+
+    def registrar(self, rota_id, timestamp, nivel_agua, nivel_bloqueio):
+        """Registra uma leitura de sensor.
+
+        Leituras podem chegar fora de ordem (vários sensores por rota, frames com
+        idade). Uma leitura anterior à última da rota é guardada entre as brutas,
+        mas não altera a taxa de subida nem a última leitura, e só entra no
+        agregado em aberto se pertencer à mesma janela; janelas já fechadas não
+        são reabertas.
+
+        Args:
+            rota_id (int): ID da rota monitorada.
+            timestamp (float): Instante da leitura (segundos desde a época).
+            nivel_agua (int): Leitura do sensor de nível de água.
+            nivel_bloqueio (int): Leitura do sensor de bloqueio.
+        """
+        linha = self._linha(rota_id)
+        self.brutos.anexar(linha, rota_id, (timestamp, nivel_agua, nivel_bloqueio))
+
+        # Taxa de subida da água: média móvel exponencial ponderada pelo tempo
+        t_ant, agua_ant, _ = self.ultimo[linha]
+        dt = timestamp - t_ant
+        if dt < 0:
+            self.leituras_atrasadas += 1
+        else:
+            if dt > 0:
+                taxa = (nivel_agua - agua_ant) / dt * 60
+                alfa = 1 - math.exp(-dt / self.tau_taxa)
+                self.taxa_agua[linha] += alfa * (taxa - self.taxa_agua[linha])
+            self.ultimo[linha] = (timestamp, nivel_agua, nivel_bloqueio)
+
+        for nome, periodo in PERIODOS_ROLLUP.items():
+            aberto = self.abertos[nome][linha]
+            janela = timestamp // periodo
+            if aberto[7] and janela < aberto[0]:
+                continue  # Janela já fechada
+            if aberto[7] and janela > aberto[0]:
+                self._fechar_rollup(nome, linha, rota_id)
+            if not aberto[7]:
+                aberto[:] = (janela, nivel_agua, nivel_agua, 0, nivel_bloqueio, nivel_bloqueio, 0, 0)
+            aberto[1] = min(aberto[1], nivel_agua)
+            aberto[2] = max(aberto[2], nivel_agua)
+            aberto[3] += nivel_agua
+            aberto[4] = min(aberto[4], nivel_bloqueio)
+            aberto[5] = max(aberto[5], nivel_bloqueio)
+            aberto[6] += nivel_bloqueio
+            aberto[7] += 1
+
+    def _fechar_rollup(self, nome, linha, rota_id):
+        """Move o agregado em aberto da rota para o buffer do período."""
+        janela, a_min, a_max, a_soma, b_min, b_max, b_soma, n = self.abertos[nome][linha]
+        self.rollups[nome].anexar(linha, rota_id, (
+            janela * PERIODOS_ROLLUP[nome], a_min, a_max, a_soma / n, b_min, b_max, b_soma / n))
+        self.abertos[nome][linha, 7] = 0
+
+    def tendencia_rota(self, rota_id, janela_segundos=900):
+        """Consulta a tendência recente de uma rota.
+
+        Args:
+            rota_id (int): ID da rota.
+            janela_segundos (float): Janela de tempo, contada a partir da leitura mais recente.
+
+        Returns:
+            dict: Séries 'timestamp', 'nivel_agua' e 'nivel_bloqueio' da janela, a
+                inclinação do nível de água por minuto ('inclinacao_agua') por mínimos
+                quadrados e a taxa móvel de subida ('taxa_agua'), ou None se a rota
+                não tiver leituras.
+        """
+        linha = self.linhas.get(rota_id)
+        if linha is None:
+            return None
+
+        registros = self.brutos.ordenados(linha)
+        if np.any(np.diff(registros[:, 0]) < 0):
+            # Leituras fora de ordem: ordena pelo timestamp antes da busca binária
+            registros = registros[np.argsort(registros[:, 0], kind='stable')]
+        inicio = np.searchsorted(registros[:, 0], registros[-1, 0] - janela_segundos)
+        t, agua, bloqueio = registros[inicio:].T
+
+        inclinacao = 0.0
+        if len(t) > 1:
+            dt = t - t.mean()
+            var = dt @ dt
+            if var > 0:
+                inclinacao = (dt @ (agua - agua.mean())) / var * 60
+
+        return {
+            'timestamp': t,
+            'nivel_agua': agua,
+            'nivel_bloqueio': bloqueio,
+            'inclinacao_agua': inclinacao,
+            'taxa_agua': self.taxa_agua[linha],
+        }
+
+    def top_subida_agua(self, n=5):
+        """Rotas com o nível de água subindo mais rápido.
+
+        A taxa de cada rota decai com a mesma meia-vida da média móvel pelo tempo
+        desde a sua última leitura, contado a partir da leitura mais recente do
+        histórico; rotas que pararam de reportar deixam o topo do ranking.
+
+        Args:
+            n (int): Número de rotas a retornar.
+
+        Returns:
+            list: Tuplas (rota_id, taxa_por_minuto, nivel_agua_atual) em ordem decrescente de taxa.
+        """
+        total = len(self.linhas)
+        if total == 0:
+            return []
+
+        ultimos = self.ultimo[:total, 0]
+        taxas = self.taxa_agua[:total] * np.exp(-(ultimos.max() - ultimos) / self.tau_taxa)
+        n = min(n, total)
+        candidatas = np.argpartition(-taxas, n - 1)[:n]
+        candidatas = candidatas[np.argsort(-taxas[candidatas])]
+        return [(int(self.rota_ids[i]), float(taxas[i]), float(self.ultimo[i, 1]))
+                for i in candidatas]
+
+    def rollups_rota(self, rota_id, periodo='1min'):
+        """Agregados fechados de uma rota mantidos em memória.
+
+        Args:
+            rota_id (int): ID da rota.
+            periodo (str): '1min', '15min' ou '1h'.
+
+        Returns:
+            numpy.ndarray: Matriz com colunas CAMPOS_ROLLUP em ordem cronológica.
+        """
+        linha = self.linhas.get(rota_id)
+        if linha is None:
+            return np.empty((0, len(CAMPOS_ROLLUP)))
+        return self.rollups[periodo].ordenados(linha)
+
+    def historico_disco(self, rota_id, periodo=None):
+        """Lê os dados de uma rota que já foram gravados em disco.
+
+        Args:
+            rota_id (int): ID da rota.
+            periodo (str): None para leituras brutas, ou '1min', '15min', '1h' para agregados.
+
+        Returns:
+            numpy.ndarray: Matriz com colunas CAMPOS_BRUTOS ou CAMPOS_ROLLUP.
+        """
+        anel = self.brutos if periodo is None else self.rollups[periodo]
+        num_campos = anel.dados.shape[2]
+        caminho = anel.caminho(rota_id)
+        if not os.path.exists(caminho):
+            return np.empty((0, num_campos))
+        return np.fromfile(caminho).reshape(-1, num_campos)
@@ -11,6 +11,29 @@ const int ledVerde = 27;     // LED indicador de estrada livre
 // ID da rota monitorada
 const int rotaID = 7;  // ID da rota que está sendo monitorada
 
+// Protocolo de saída: false = texto DADOS_SENSOR (depuração), true = frames binários em lote
+const bool modoBinario = false;
+const int leiturasPorFrame = 4;  // Leituras agrupadas em cada frame binário
+
+// Layout do frame (little-endian), decodificado por src/api/sensor_protocol.py:
+// cabeçalho 0xD5 0x5E | versão u8 | nº leituras u8 | id do nó u16 | sequência u32
+// leitura   rota_id u16 | status u8 | água u16 | bloqueio u16 | idade u16 (décimos de s)
+// rodapé    CRC32 do cabeçalho e das leituras
+const uint8_t versaoProtocolo = 1;
+const int tamanhoCabecalho = 10;
+const int tamanhoLeitura = 9;
+
+struct Leitura {
+  uint8_t status;
+  uint16_t agua;
+  uint16_t bloqueio;
+  unsigned long instante;
+};
+
+Leitura leiturasPendentes[leiturasPorFrame];
+int numPendentes = 0;
+uint32_t sequenciaFrame = 0;
+
 void setup() {
   Serial.begin(115200);
   
@@ -33,6 +56,56 @@ void setup() {
   Serial.println("Sistema de monitoramento de rotas iniciado!");
 }
 
+// CRC32 compatível com zlib.crc32 (polinômio refletido 0xEDB88320)
+uint32_t calcularCRC32(const uint8_t *dados, size_t tamanho) {
+  uint32_t crc = 0xFFFFFFFF;
+  for (size_t i = 0; i < tamanho; i++) {
+    crc ^= dados[i];
+    for (int b = 0; b < 8; b++) {
+      crc = (crc >> 1) ^ (0xEDB88320 & (-(int32_t)(crc & 1)));
+    }
+  }
+  return ~crc;
+}
+
+void escreverU16(uint8_t *buffer, int pos, uint16_t valor) {
+  buffer[pos] = valor & 0xFF;
+  buffer[pos + 1] = valor >> 8;
+}
+
+void escreverU32(uint8_t *buffer, int pos, uint32_t valor) {
+  for (int i = 0; i < 4; i++) {
+    buffer[pos + i] = (valor >> (8 * i)) & 0xFF;
+  }
+}
+
+void enviarFrame() {
+  uint8_t frame[tamanhoCabecalho + tamanhoLeitura * leiturasPorFrame + 4];
+  unsigned long agora = millis();
+
+  frame[0] = 0xD5;
+  frame[1] = 0x5E;
+  frame[2] = versaoProtocolo;
+  frame[3] = numPendentes;
+  escreverU16(frame, 4, rotaID);
+  escreverU32(frame, 6, sequenciaFrame++);
+
+  int pos = tamanhoCabecalho;
+  for (int i = 0; i < numPendentes; i++) {
+    unsigned long idade = (agora - leiturasPendentes[i].instante) / 100;
+    escreverU16(frame, pos, rotaID);
+    frame[pos + 2] = leiturasPendentes[i].status;
+    escreverU16(frame, pos + 3, leiturasPendentes[i].agua);
+    escreverU16(frame, pos + 5, leiturasPendentes[i].bloqueio);
+    escreverU16(frame, pos + 7, idade > 0xFFFF ? 0xFFFF : idade);
+    pos += tamanhoLeitura;
+  }
+
+  escreverU32(frame, pos, calcularCRC32(frame, pos));
+  Serial.write(frame, pos + 4);
+  numPendentes = 0;
+}
+
 void loop() {
   // Leitura dos sensores
   int bloqueioValor = analogRead(bloqueioPin);
@@ -40,6 +113,7 @@ void loop() {
   
   // Determinação do status da rota
   String status;
+  uint8_t codigoStatus;
   
   // Desliga todos os LEDs primeiro
   digitalWrite(ledVermelho, LOW);
@@ -49,15 +123,32 @@ void loop() {
   // Acende o LED apropriado
   if (bloqueioValor > 3000 || nivelAgua > 3500) {
     status = "bloqueada";
+    codigoStatus = 2;
     digitalWrite(ledVermelho, HIGH);
   } else if (bloqueioValor > 2000 || nivelAgua > 2000) {
     status = "parcial";
+    codigoStatus = 1;
     digitalWrite(ledAmarelo, HIGH);
   } else {
     status = "livre";
+    codigoStatus = 0;
     digitalWrite(ledVerde, HIGH);
   }
   
+  if (modoBinario) {
+    // Acumula a leitura e envia o lote quando completo
+    leiturasPendentes[numPendentes].status = codigoStatus;
+    leiturasPendentes[numPendentes].agua = nivelAgua;
+    leiturasPendentes[numPendentes].bloqueio = bloqueioValor;
+    leiturasPendentes[numPendentes].instante = millis();
+    numPendentes++;
+    if (numPendentes == leiturasPorFrame) {
+      enviarFrame();
+    }
+    delay(5000);  // 5 segundos
+    return;
+  }
+  
   // Exibir informações no Serial Monitor
   Serial.println("=== Status da Rota " + String(rotaID) + " ===");
   Serial.println("Status: " + status);
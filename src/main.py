@@ -1,10 +1,11 @@
 import os
-import time
 import argparse
 from data.data_generator import DataGenerator
+from data.sensor_timeseries import SensorTimeSeries
 from models.criticality_classifier import CriticalityClassifier
 from models.route_network import RouteNetwork
 from models.resource_allocator import ResourceAllocator
+from models.fleet_simulator import FleetSimulator
 from api.sensor_integration import SensorIntegration
 
 class HumanitarianLogisticsSystem:
@@ -19,7 +20,10 @@ class HumanitarianLogisticsSystem:
         self.classifier = CriticalityClassifier(input_dir=self.data_dir, output_dir=self.data_dir)
         self.network = RouteNetwork(input_dir=self.data_dir, output_dir=self.data_dir)
         self.allocator = ResourceAllocator(input_dir=self.data_dir, output_dir=self.data_dir)
-        self.sensor = SensorIntegration(input_dir=self.data_dir, output_dir=self.data_dir)
+        self.simulador = FleetSimulator(input_dir=self.data_dir)
+        self.historico = SensorTimeSeries(output_dir=f'{self.data_dir}historico/')
+        self.sensor = SensorIntegration(input_dir=self.data_dir, output_dir=self.data_dir,
+                                        historico=self.historico)
         
     def inicializar_sistema(self):
         """Inicializa todo o sistema em sequência"""
@@ -57,8 +61,13 @@ class HumanitarianLogisticsSystem:
         print("SIMULAÇÃO: Atualizando status de rota via sensor ESP32")
         print("="*80 + "\n")
         
+        # Plano vigente antes da mudança, com as rotas alternativas pré-calculadas
+        if self.allocator.plano is None:
+            self.allocator.alocar_recursos()
+        
         # Simular dados do sensor
         sensor_data = self.sensor.simular_dados_sensor()
+        self.sensor.registrar_leitura(sensor_data)
         print(f"Dados recebidos do sensor:")
         print(f"  Rota: {sensor_data['origem']} → {sensor_data['destino']}")
         print(f"  Novo status: {sensor_data['status']}")
@@ -71,26 +80,56 @@ class HumanitarianLogisticsSystem:
         # Visualizar a rede atualizada
         self.network.visualizar_rede('rede_logistica_atualizada.png')
         
-        # Recalcular plano logístico
+        # Promover rotas alternativas e reotimizar o plano em segundo plano
         if sensor_data['status'] == 'bloqueada':
-            print("\nRota bloqueada detectada! Recalculando plano logístico...\n")
-            plano = self.allocator.alocar_recursos()
-            self.allocator.exibir_resumo_plano(plano)
+            print("\nRota bloqueada detectada! Promovendo rotas alternativas...\n")
+            reotimizacao = self.allocator.aplicar_bloqueio(f"A{sensor_data['origem']}",
+                                                           f"A{sensor_data['destino']}")
+            self.allocator.exibir_resumo_plano(self.allocator.plano)
+            
+            print("\nReotimização completa do plano em segundo plano...")
+            reotimizacao.add_done_callback(self._reotimizacao_concluida)
         
         return True
     
+    def _reotimizacao_concluida(self, reotimizacao):
+        """Informa o fim da reotimização executada em segundo plano"""
+        if reotimizacao.exception() is not None:
+            print(f"Falha na reotimização do plano: {reotimizacao.exception()}")
+        else:
+            print(f"Reotimização concluída: plano com {len(reotimizacao.result())} entregas")
+    
+    def simular_operacao_frota(self, duracao_h=72):
+        """Executa o plano logístico no tempo simulado com a frota de veículos"""
+        print("\n" + "="*80)
+        print(f"SIMULAÇÃO: Operação da frota por {duracao_h} horas")
+        print("="*80 + "\n")
+        
+        plano = self.allocator.plano
+        if plano is None:
+            plano = self.allocator.alocar_recursos()
+        
+        relatorio = self.simulador.simular(plano, duracao_h=duracao_h, eventos_sensor_por_hora=2)
+        self.simulador.exibir_relatorio(relatorio)
+        return relatorio
+    
     def executar_simulacao_completa(self):
         """Executa uma simulação completa do sistema"""
         self.inicializar_sistema()
         
-        # Aguardar um momento para simular passagem de tempo
-        print("\nAguardando 3 segundos para simular passagem de tempo...\n")
-        time.sleep(3)
+        # Simular a passagem do tempo executando o plano com a frota
+        print("\n--- SIMULAÇÃO DA OPERAÇÃO DA FROTA ---\n")
+        relatorio = self.simulador.simular(self.allocator.plano, duracao_h=24, eventos_sensor_por_hora=2)
+        self.simulador.exibir_relatorio(relatorio)
         
         # Simular múltiplas atualizações do sensor
         print("\n--- ETAPA 5: SIMULAÇÃO DE MONITORAMENTO ESP32 ---\n")
         self.sensor.monitorar_simulado(intervalo_segundos=2, num_atualizacoes=3)
         
+        print("\nRotas com maior subida do nível de água:")
+        for rota_id, taxa, nivel in self.historico.top_subida_agua(3):
+            print(f"  Rota {rota_id}: {taxa:+.1f}/min (nível atual {nivel:.0f})")
+        
         # Recalcular plano após mudanças
         print("\n--- ETAPA 6: RECÁLCULO DO PLANO LOGÍSTICO ---\n")
         plano = self.allocator.alocar_recursos()
@@ -108,6 +147,7 @@ def main():
     parser.add_argument('--init', action='store_true', help='Inicializar o sistema')
     parser.add_argument('--sensor', action='store_true', help='Simular atualização de sensor')
     parser.add_argument('--full', action='store_true', help='Executar simulação completa')
+    parser.add_argument('--frota', type=float, metavar='HORAS', help='Simular a operação da frota por HORAS')
     
     args = parser.parse_args()
     
@@ -117,6 +157,8 @@ def main():
         system.inicializar_sistema()
     elif args.sensor:
         system.simular_atualizacao_sensor()
+    elif args.frota:
+        system.simular_operacao_frota(duracao_h=args.frota)
     elif args.full:
         system.executar_simulacao_completa()
     else:
@@ -0,0 +1,349 @@
+import heapq
+import itertools
+import pickle
+import random
+import time
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from .route_alternatives import RouteAlternatives, chave_aresta
+
+CRITICIDADE_NUM = {'alta': 2, 'média': 1, 'baixa': 0}
+
+# Tipos de evento da simulação
+PEDIDO, CHEGADA, DESCARGA, RETORNO, REABASTECIMENTO, SENSOR = range(6)
+
+
+class FleetSimulator:
+    def __init__(self, input_dir='src/data/', politica_despacho='criticidade',
+                 politica_replanejamento='alternativa', tempo_descarga_min=30,
+                 intervalo_demanda_h=24, intervalo_reabastecimento_h=12,
+                 fator_frota=1, semente=None):
+        """Simulação de eventos discretos da operação da frota sobre o plano logístico.
+
+        O plano é executado no tempo simulado: veículos partem dos centros,
+        viajam, descarregam e retornam; os estoques são reabastecidos
+        periodicamente e as áreas voltam a pedir recursos. Mudanças de status das
+        rotas (sensores) ocorrem em instantes simulados e a política de
+        replanejamento é aplicada aos pedidos ainda não despachados.
+
+        Args:
+            input_dir (str): Diretório onde os dados de entrada estão armazenados.
+            politica_despacho (str): Ordem de atendimento da fila de cada centro:
+                'criticidade', 'fifo' ou 'mais_proximo'.
+            politica_replanejamento (str): Reação a mudanças nas rotas:
+                'alternativa' (promove rotas pré-calculadas), 'recalcular'
+                (caminho mais curto no despacho) ou 'nenhuma' (mantém a rota do plano
+                e aguarda a liberação).
+            tempo_descarga_min (float): Duração da descarga em cada área.
+            intervalo_demanda_h (float): Intervalo até uma área atendida pedir novamente.
+            intervalo_reabastecimento_h (float): Intervalo de reposição dos estoques dos centros.
+            fator_frota (int): Multiplicador do número de veículos de cada centro.
+            semente (int): Semente aleatória para os eventos de sensor gerados.
+        """
+        if politica_despacho not in ('criticidade', 'fifo', 'mais_proximo'):
+            raise ValueError(f"Política de despacho inválida: {politica_despacho}")
+        if politica_replanejamento not in ('alternativa', 'recalcular', 'nenhuma'):
+            raise ValueError(f"Política de replanejamento inválida: {politica_replanejamento}")
+
+        self.input_dir = input_dir
+        self.politica_despacho = politica_despacho
+        self.politica_replanejamento = politica_replanejamento
+        self.tempo_descarga_min = tempo_descarga_min
+        self.intervalo_demanda_min = intervalo_demanda_h * 60
+        self.intervalo_reabastecimento_min = intervalo_reabastecimento_h * 60
+        self.fator_frota = fator_frota
+        self.rng = random.Random(semente)
+
+    def _carregar(self, plano):
+        """Prepara o estado inicial da simulação."""
+        with open(f"{self.input_dir}rede_logistica.pkl", 'rb') as f:
+            self.G = pickle.load(f)
+
+        # Tempo base de cada via (sem restrições), inclusive das vias hoje bloqueadas
+        rotas_df = pd.read_csv(f'{self.input_dir}rotas.csv')
+        self.tempo_base = {
+            chave_aresta(f"A{r.origem}", f"A{r.destino}"): float(r.tempo_percurso_min)
+            for r in rotas_df.itertuples(index=False)
+        }
+        self.rotas_sensor = [(f"A{r.origem}", f"A{r.destino}") for r in rotas_df.itertuples(index=False)]
+
+        centros_df = pd.read_csv(f'{self.input_dir}centros_distribuicao.csv')
+        self.estoque_inicial = {}
+        self.estoque = {}
+        self.veiculos = {}
+        for c in centros_df.itertuples(index=False):
+            centro_id = f"C{c.id}"
+            self.estoque_inicial[centro_id] = np.array(
+                [c.estoque_agua, c.estoque_alimentos, c.estoque_medicamentos], dtype=np.int64)
+            self.estoque[centro_id] = self.estoque_inicial[centro_id].copy()
+            self.veiculos[centro_id] = int(c.capacidade_veiculos) * self.fator_frota
+        self.total_veiculos = sum(self.veiculos.values())
+
+        self.filas = {centro_id: [] for centro_id in self.veiculos}
+        self.aguardando_rota = {centro_id: [] for centro_id in self.veiculos}
+        self.rotas_fixas = {}
+        self.cache_rotas = {}
+        self.alternativas = None
+        if self.politica_replanejamento == 'alternativa':
+            self.alternativas = RouteAlternatives()
+            self.alternativas.calcular(self.G, plano)
+        elif self.politica_replanejamento == 'nenhuma':
+            self.rotas_fixas = {(e.centro_origem, e.area_destino): e.rota for e in plano}
+
+        self.eventos = []
+        self.contador = itertools.count()
+
+    def _agendar(self, t, tipo, dados=None):
+        heapq.heappush(self.eventos, (t, next(self.contador), tipo, dados))
+
+    def _rota(self, centro, area):
+        """Rota e tempo de viagem atuais de um centro a uma área, conforme a política.
+
+        Returns:
+            tuple: (rota, tempo_min), ou None se não houver rota utilizável.
+        """
+        if self.politica_replanejamento == 'alternativa':
+            if (centro, area) not in self.alternativas.cache:
+                self.alternativas.calcular_par(centro, area)
+            return self.alternativas.rota_ativa(centro, area)
+
+        if self.politica_replanejamento == 'nenhuma':
+            rota = self.rotas_fixas.get((centro, area))
+            if rota is None or not all(self.G.has_edge(u, v) for u, v in zip(rota[:-1], rota[1:])):
+                return None
+            return rota, sum(self.G[u][v]['weight'] for u, v in zip(rota[:-1], rota[1:]))
+
+        par = (centro, area)
+        if par not in self.cache_rotas:
+            try:
+                tempo, rota = nx.single_source_dijkstra(self.G, centro, area, weight='weight')
+                self.cache_rotas[par] = (rota, tempo)
+            except (nx.NetworkXNoPath, nx.NodeNotFound):
+                self.cache_rotas[par] = None
+        return self.cache_rotas[par]
+
+    def _enfileirar(self, t, entrega):
+        if self.politica_despacho == 'criticidade':
+            chave = (-CRITICIDADE_NUM.get(entrega.criticidade, -1), -entrega.pessoas_atendidas, t)
+        elif self.politica_despacho == 'mais_proximo':
+            chave = (entrega.tempo_estimado_min, t)
+        else:
+            chave = (t,)
+        heapq.heappush(self.filas[entrega.centro_origem], (chave, next(self.contador), t, entrega))
+
+    def _despachar(self, t, centro):
+        """Despacha pedidos da fila do centro enquanto houver veículos e estoque."""
+        fila = self.filas[centro]
+        while fila and self.veiculos[centro] > 0:
+            if not self.estoque[centro].any():
+                return  # Aguarda reabastecimento
+
+            pedido = heapq.heappop(fila)
+            _, _, t_pedido, entrega = pedido
+            rota = self._rota(centro, entrega.area_destino)
+            if rota is None:
+                # Sem rota utilizável: aguarda mudança no status das vias
+                self.aguardando_rota[centro].append(pedido)
+                continue
+
+            caminho, tempo_viagem = rota
+            pedido_recursos = np.array([entrega.agua, entrega.alimentos, entrega.medicamentos])
+            carga = np.minimum(pedido_recursos, self.estoque[centro])
+            self.estoque[centro] -= carga
+            self.veiculos[centro] -= 1
+
+            self.metricas['despachos'] += 1
+            self.metricas['espera_min'].append(t - t_pedido)
+            self._agendar(t + tempo_viagem, CHEGADA, (centro, entrega, carga, t_pedido, t, tempo_viagem))
+
+    def _aplicar_sensor(self, t, origem, destino, status):
+        """Aplica uma mudança de status de via e a política de replanejamento."""
+        aresta = chave_aresta(origem, destino)
+        base = self.tempo_base.get(aresta)
+        if base is None:
+            return
+        self.metricas['eventos_sensor'] += 1
+
+        estava_bloqueada = not self.G.has_edge(origem, destino)
+        if status == 'bloqueada':
+            if estava_bloqueada:
+                return
+            self.G.remove_edge(origem, destino)
+        else:
+            self.G.add_edge(origem, destino, weight=base * (2 if status == 'parcial' else 1),
+                            status=status)
+
+        if self.politica_replanejamento == 'alternativa':
+            if status == 'bloqueada':
+                alterados = self.alternativas.bloquear_aresta(origem, destino)
+            else:
+                alterados = self.alternativas.liberar_aresta(origem, destino) if estava_bloqueada else {}
+                alterados.update(self.alternativas.atualizar_peso_aresta(origem, destino))
+                # Entregas sem nenhuma alternativa válida buscam novas rotas na rede atual
+                for par, entrada in list(self.alternativas.cache.items()):
+                    if entrada['ativa'] is None:
+                        self.alternativas.calcular_par(*par)
+                        alterados[par] = self.alternativas.rota_ativa(*par)
+            self.metricas['replanejamentos'] += len(alterados)
+        elif self.politica_replanejamento == 'recalcular':
+            if status == 'bloqueada':
+                afetados = [par for par, r in self.cache_rotas.items()
+                            if r is not None and aresta in {chave_aresta(u, v) for u, v in zip(r[0][:-1], r[0][1:])}]
+            else:
+                # Uma via liberada ou com novo tempo pode melhorar qualquer rota
+                afetados = list(self.cache_rotas)
+            for par in afetados:
+                del self.cache_rotas[par]
+            self.metricas['replanejamentos'] += len(afetados)
+
+        if status != 'bloqueada':
+            # Pedidos sem rota voltam para a fila
+            for centro, pendentes in self.aguardando_rota.items():
+                for pedido in pendentes:
+                    heapq.heappush(self.filas[centro], pedido)
+                pendentes.clear()
+                self._despachar(t, centro)
+
+    def _gerar_eventos_sensor(self, duracao_min, eventos_por_hora):
+        """Gera mudanças de status aleatórias nas vias monitoradas (processo de Poisson)."""
+        if eventos_por_hora <= 0 or not self.rotas_sensor:
+            return
+        t = self.rng.expovariate(eventos_por_hora / 60)
+        while t < duracao_min:
+            origem, destino = self.rng.choice(self.rotas_sensor)
+            status = self.rng.choice(['livre', 'parcial', 'bloqueada'])
+            self._agendar(t, SENSOR, (origem, destino, status))
+            t += self.rng.expovariate(eventos_por_hora / 60)
+
+    def simular(self, plano, duracao_h=72, eventos_sensor=None, eventos_sensor_por_hora=0):
+        """Executa a simulação.
+
+        Args:
+            plano (iterable): Entregas do plano logístico (ResourceAllocator.alocar_recursos).
+            duracao_h (float): Horizonte simulado em horas.
+            eventos_sensor (list): Mudanças de status programadas, como dicionários com
+                't_min', 'origem', 'destino' (IDs de área, como em rotas.csv) e 'status'.
+            eventos_sensor_por_hora (float): Taxa de mudanças de status aleatórias.
+
+        Returns:
+            dict: Métricas de desempenho da operação simulada.
+        """
+        inicio_real = time.perf_counter()
+        plano = list(plano)
+        self._carregar(plano)
+        duracao_min = duracao_h * 60
+        self.metricas = {
+            'despachos': 0, 'entregas': 0, 'pessoas_atendidas': 0,
+            'recursos_entregues': np.zeros(3, dtype=np.int64),
+            'espera_min': [], 'atendimento_min': [], 'veiculo_min': 0.0,
+            'eventos_sensor': 0, 'replanejamentos': 0, 'eventos': 0,
+        }
+
+        for entrega in plano:
+            self._agendar(0.0, PEDIDO, entrega)
+        self._agendar(self.intervalo_reabastecimento_min, REABASTECIMENTO)
+        for evento in eventos_sensor or []:
+            self._agendar(evento['t_min'], SENSOR,
+                          (f"A{evento['origem']}", f"A{evento['destino']}", evento['status']))
+        self._gerar_eventos_sensor(duracao_min, eventos_sensor_por_hora)
+
+        while self.eventos and self.eventos[0][0] <= duracao_min:
+            t, _, tipo, dados = heapq.heappop(self.eventos)
+            self.metricas['eventos'] += 1
+
+            if tipo == PEDIDO:
+                self._enfileirar(t, dados)
+                self._despachar(t, dados.centro_origem)
+
+            elif tipo == CHEGADA:
+                self._agendar(t + self.tempo_descarga_min, DESCARGA, dados)
+
+            elif tipo == DESCARGA:
+                centro, entrega, carga, t_pedido, t_partida, tempo_viagem = dados
+                self.metricas['entregas'] += 1
+                self.metricas['pessoas_atendidas'] += entrega.pessoas_atendidas
+                self.metricas['recursos_entregues'] += carga
+                self.metricas['atendimento_min'].append(t - t_pedido)
+                # Retorno pelo mesmo percurso; a área volta a pedir após o intervalo de demanda
+                self._agendar(t + tempo_viagem, RETORNO, (centro, t_partida))
+                self._agendar(t + self.intervalo_demanda_min, PEDIDO, entrega)
+
+            elif tipo == RETORNO:
+                centro, t_partida = dados
+                self.veiculos[centro] += 1
+                self.metricas['veiculo_min'] += t - t_partida
+                self._despachar(t, centro)
+
+            elif tipo == REABASTECIMENTO:
+                for centro, estoque in self.estoque_inicial.items():
+                    self.estoque[centro] = estoque.copy()
+                    self._despachar(t, centro)
+                self._agendar(t + self.intervalo_reabastecimento_min, REABASTECIMENTO)
+
+            elif tipo == SENSOR:
+                self._aplicar_sensor(t, *dados)
+
+        # Veículos ainda em viagem no fim do horizonte contam até o instante final
+        for _, _, tipo, dados in self.eventos:
+            if tipo in (CHEGADA, DESCARGA):
+                self.metricas['veiculo_min'] += duracao_min - dados[4]
+            elif tipo == RETORNO:
+                self.metricas['veiculo_min'] += duracao_min - dados[1]
+
+        return self._gerar_relatorio(duracao_min, time.perf_counter() - inicio_real)
+
+    def _gerar_relatorio(self, duracao_min, tempo_real):
+        m = self.metricas
+        atendimento = np.array(m['atendimento_min'])
+        espera = np.array(m['espera_min'])
+        return {
+            'politica_despacho': self.politica_despacho,
+            'politica_replanejamento': self.politica_replanejamento,
+            'horas_simuladas': duracao_min / 60,
+            'veiculos': self.total_veiculos,
+            'despachos': m['despachos'],
+            'entregas_concluidas': m['entregas'],
+            'entregas_por_dia': m['entregas'] / (duracao_min / 1440) if duracao_min else 0.0,
+            'pessoas_atendidas': m['pessoas_atendidas'],
+            'agua_entregue': int(m['recursos_entregues'][0]),
+            'alimentos_entregues': int(m['recursos_entregues'][1]),
+            'medicamentos_entregues': int(m['recursos_entregues'][2]),
+            'espera_media_min': float(espera.mean()) if len(espera) else None,
+            'atendimento_medio_min': float(atendimento.mean()) if len(atendimento) else None,
+            'atendimento_p95_min': float(np.percentile(atendimento, 95)) if len(atendimento) else None,
+            'utilizacao_frota': m['veiculo_min'] / (self.total_veiculos * duracao_min) if duracao_min else 0.0,
+            'pedidos_pendentes': sum(len(f) for f in self.filas.values())
+                                 + sum(len(p) for p in self.aguardando_rota.values()),
+            'eventos_sensor': m['eventos_sensor'],
+            'replanejamentos': m['replanejamentos'],
+            'eventos_processados': m['eventos'],
+            'tempo_execucao_s': tempo_real,
+        }
+
+    def exibir_relatorio(self, relatorio):
+        """Exibe um resumo da simulação da frota.
+
+        Args:
+            relatorio (dict): Métricas retornadas por simular().
+        """
+        def minutos(valor):
+            return "n/d" if valor is None else f"{valor:.1f} min"
+
+        print("\nResultado da simulação da frota:")
+        print(f"  Políticas: despacho '{relatorio['politica_despacho']}', "
+              f"replanejamento '{relatorio['politica_replanejamento']}'")
+        print(f"  Horizonte: {relatorio['horas_simuladas']:.0f} h com {relatorio['veiculos']} veículos "
+              f"({relatorio['eventos_processados']} eventos em {relatorio['tempo_execucao_s']:.2f} s)")
+        print(f"  Entregas concluídas: {relatorio['entregas_concluidas']} "
+              f"({relatorio['entregas_por_dia']:.1f}/dia), pessoas atendidas: {relatorio['pessoas_atendidas']}")
+        print(f"  Recursos entregues: Água: {relatorio['agua_entregue']}, "
+              f"Alimentos: {relatorio['alimentos_entregues']}, Medicamentos: {relatorio['medicamentos_entregues']}")
+        print(f"  Espera média na fila: {minutos(relatorio['espera_media_min'])}, "
+              f"atendimento médio: {minutos(relatorio['atendimento_medio_min'])} "
+              f"(p95 {minutos(relatorio['atendimento_p95_min'])})")
+        print(f"  Utilização da frota: {relatorio['utilizacao_frota']:.1%}, "
+              f"pedidos pendentes: {relatorio['pedidos_pendentes']}")
+        print(f"  Eventos de sensor: {relatorio['eventos_sensor']}, rotas replanejadas: {relatorio['replanejamentos']}")
@@ -2,36 +2,126 @@ import networkx as nx
 import pandas as pd
 import numpy as np
 from collections import defaultdict
+import csv
+import itertools
+import json
 import os
 import pickle  # Adicione esta importação
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+from .route_alternatives import RouteAlternatives
+from .travel_time_matrix import TravelTimeMatrix
+
+class Entrega(NamedTuple):
+    """Entrega planejada: um veículo levando recursos de um centro a uma área."""
+    centro_origem: str
+    area_destino: str
+    criticidade: str
+    pessoas_atendidas: int
+    agua: int
+    alimentos: int
+    medicamentos: int
+    tempo_estimado_min: float
+    rota: tuple
+
+class EscritorPlanoCSV:
+    def __init__(self, arquivo, intervalo_flush=100):
+        """Grava entregas em CSV à medida que são decididas.
+        
+        Args:
+            arquivo (str): Caminho do arquivo CSV.
+            intervalo_flush (int): Número de entregas entre descargas do buffer em disco.
+        """
+        self.arquivo = arquivo
+        self.intervalo_flush = intervalo_flush
+        self._f = None
+        self._writer = None
+        self._pendentes = 0
+        
+    def __enter__(self):
+        self._f = open(self.arquivo, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._f, lineterminator='\n')
+        self._writer.writerow(Entrega._fields)
+        self._f.flush()
+        return self
+    
+    def __exit__(self, *exc):
+        self._f.close()
+        
+    def escrever(self, entrega):
+        """Grava uma entrega, com a rota no formato 'C1->A3->A7'."""
+        self._writer.writerow(entrega._replace(rota='->'.join(entrega.rota)))
+        self._descarregar()
+        
+    def _descarregar(self):
+        # A primeira entrega (a mais crítica) fica visível imediatamente
+        self._pendentes += 1
+        if self._pendentes == 1 or self._pendentes % self.intervalo_flush == 0:
+            self._f.flush()
+
+class EscritorPlanoJSONL(EscritorPlanoCSV):
+    """Grava entregas em JSON Lines (um objeto JSON por linha) à medida que são decididas."""
+        
+    def __enter__(self):
+        self._f = open(self.arquivo, 'w', encoding='utf-8')
+        return self
+        
+    def escrever(self, entrega):
+        """Grava uma entrega como um objeto JSON em uma linha."""
+        registro = entrega._asdict()
+        registro['rota'] = list(entrega.rota)
+        self._f.write(json.dumps(registro, ensure_ascii=False) + '\n')
+        self._descarregar()
 
 class ResourceAllocator:
-    def __init__(self, input_dir='src/data/', output_dir='src/data/'):
+    def __init__(self, input_dir='src/data/', output_dir='src/data/', num_alternativas=3):
         """Otimizador de alocação de recursos para ajuda humanitária.
         
         Args:
             input_dir (str): Diretório onde os dados de entrada estão armazenados.
             output_dir (str): Diretório onde os resultados serão salvos.
+            num_alternativas (int): Rotas alternativas mantidas por entrega planejada.
         """
         self.input_dir = input_dir
         self.output_dir = output_dir
+        self.num_alternativas = num_alternativas
         self.G = None
+        self.plano = None
+        self.alternativas = None
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        # Protege G, plano e alternativas, trocados em bloco ao fim de cada reotimização
+        self._lock = threading.Lock()
+        self._versao_rede = 0
+        self._reotimizacao = None
         
-    def alocar_recursos(self):
-        """Aloca recursos para áreas afetadas otimizando rotas e prioridades.
+    def _carregar_rede(self):
+        """Carrega o grafo da rede logística salvo em disco."""
+        with open(f"{self.input_dir}rede_logistica.pkl", 'rb') as f:
+            return pickle.load(f)
         
-        Returns:
-            list: Lista de planos de alocação para cada área.
-        """
-        print("Iniciando alocação otimizada de recursos...")
+    def gerar_entregas(self, G=None):
+        """Decide as entregas uma a uma, em ordem de prioridade.
         
-        # Carregando dados necessários usando pickle
-        with open(f"{self.input_dir}rede_logistica.pkl", 'rb') as f:
-            self.G = pickle.load(f)
+        As áreas mais críticas são atendidas primeiro, então as primeiras
+        entregas produzidas são as mais urgentes. Nenhuma lista do plano é
+        mantida em memória.
+        
+        Args:
+            G (networkx.Graph): Grafo da rede a usar. Padrão: rede_logistica.pkl.
+        
+        Yields:
+            Entrega: Próxima entrega decidida.
+        """
+        if G is None:
+            G = self._carregar_rede()
             
         areas_df = pd.read_csv(f'{self.input_dir}areas_afetadas_classificadas.csv')
         centros_df = pd.read_csv(f'{self.input_dir}centros_distribuicao.csv')
         
+        # Tempos de viagem pela rede (reaproveitados enquanto a rede não mudar)
+        matriz = TravelTimeMatrix(input_dir=self.input_dir, output_dir=self.output_dir).construir(G)
+        
         # Ordenar áreas por criticidade e pessoas afetadas
         # Usamos criticidade_num se disponível, senão tentamos mapear diretamente
         if 'criticidade_num' in areas_df.columns:
@@ -47,59 +137,57 @@ class ResourceAllocator:
                 by=['criticidade_temp', 'pessoas_afetadas'], 
                 ascending=[False, False]
             )
+        if 'nivel_criticidade' not in areas_ordenadas.columns:
+            areas_ordenadas = areas_ordenadas.assign(nivel_criticidade='não classificada')
         
         # Recursos disponíveis por centro
         recursos_centros = {}
-        for _, centro in centros_df.iterrows():
-            centro_id = f"C{centro['id']}"
+        for centro in centros_df.itertuples(index=False):
+            centro_id = f"C{centro.id}"
             recursos_centros[centro_id] = {
-                'agua': centro['estoque_agua'],
-                'alimentos': centro['estoque_alimentos'],
-                'medicamentos': centro['estoque_medicamentos'],
-                'veiculos': centro['capacidade_veiculos']
+                'agua': int(centro.estoque_agua),
+                'alimentos': int(centro.estoque_alimentos),
+                'medicamentos': int(centro.estoque_medicamentos),
+                'veiculos': int(centro.capacidade_veiculos)
             }
         
-        # Plano de alocação
-        plano_alocacao = []
-        
         # Para cada área, encontrar o melhor centro e planejar a entrega
-        for _, area in areas_ordenadas.iterrows():
-            area_id = f"A{area['id']}"
+        for area in areas_ordenadas.itertuples(index=False):
+            area_id = f"A{area.id}"
             necessidades = {
-                'agua': area['necessidade_agua'],
-                'alimentos': area['necessidade_alimentos'],
-                'medicamentos': area['necessidade_medicamentos']
+                'agua': int(area.necessidade_agua),
+                'alimentos': int(area.necessidade_alimentos),
+                'medicamentos': int(area.necessidade_medicamentos)
             }
             
-            # Encontrar centro mais próximo com recursos suficientes
+            # Centros com veículos disponíveis e pelo menos 50% dos recursos necessários
+            candidatos = [
+                centro_id for centro_id, recursos in recursos_centros.items()
+                if recursos['veiculos'] > 0 and all(
+                    recursos[tipo] >= necessidades[tipo] * 0.5 
+                    for tipo in necessidades
+                )
+            ]
+            
+            # Encontrar o centro mais próximo pela matriz de tempos de viagem
             melhor_centro = None
             melhor_rota = None
             menor_tempo = float('inf')
             
-            for centro_id, recursos in recursos_centros.items():
-                if recursos['veiculos'] <= 0:
-                    continue  # Pula centros sem veículos disponíveis
-                    
-                # Verificar se o centro tem pelo menos 50% dos recursos necessários
-                recursos_suficientes = all(
-                    recursos[tipo] >= necessidades[tipo] * 0.5 
-                    for tipo in necessidades
-                )
-                
-                if not recursos_suficientes:
-                    continue
-                    
-                # Calcular rota mais rápida do centro para a área
-                try:
-                    rota = nx.shortest_path(self.G, centro_id, area_id, weight='weight')
-                    tempo = sum(self.G[rota[i]][rota[i+1]]['weight'] for i in range(len(rota)-1))
-                    
-                    if tempo < menor_tempo:
-                        menor_tempo = tempo
-                        melhor_centro = centro_id
-                        melhor_rota = rota
-                except nx.NetworkXNoPath:
-                    continue  # Sem caminho disponível
+            if candidatos and area_id in matriz.indice_areas:
+                tempos = matriz.tempos_ate(area_id, candidatos)
+                minimo = tempos.min()
+                if np.isfinite(minimo):
+                    # A matriz é float32: os centros praticamente empatados são
+                    # desempatados pelo tempo exato (float64), na ordem dos candidatos
+                    empatados = np.flatnonzero(tempos <= minimo + 4 * np.spacing(minimo))
+                    for i in empatados:
+                        rota = nx.shortest_path(G, candidatos[i], area_id, weight='weight')
+                        tempo = sum(G[rota[j]][rota[j+1]]['weight'] for j in range(len(rota)-1))
+                        if tempo < menor_tempo:
+                            menor_tempo = tempo
+                            melhor_centro = candidatos[i]
+                            melhor_rota = rota
             
             # Se encontrou uma rota viável
             if melhor_centro and melhor_rota:
@@ -114,50 +202,166 @@ class ResourceAllocator:
                 # Atualizar veículos disponíveis
                 recursos_centros[melhor_centro]['veiculos'] -= 1
                 
-                # Adicionar ao plano
-                plano_alocacao.append({
-                    'centro_origem': melhor_centro,
-                    'area_destino': area_id,
-                    'criticidade': area.get('nivel_criticidade', 'não classificada'),
-                    'pessoas_atendidas': area['pessoas_afetadas'],
-                    'recursos': recursos_enviados,
-                    'rota': melhor_rota,
-                    'tempo_estimado_min': menor_tempo
-                })
-        
-        # Salvar o plano em formato CSV para fácil visualização
-        plano_df = pd.DataFrame([
-            {
-                'centro_origem': p['centro_origem'],
-                'area_destino': p['area_destino'],
-                'criticidade': p['criticidade'],
-                'pessoas_atendidas': p['pessoas_atendidas'],
-                'agua': p['recursos']['agua'],
-                'alimentos': p['recursos']['alimentos'],
-                'medicamentos': p['recursos']['medicamentos'],
-                'tempo_estimado_min': p['tempo_estimado_min'],
-                'rota': '->'.join(p['rota'])
-            }
-            for p in plano_alocacao
-        ])
-        plano_df.to_csv(f'{self.output_dir}plano_logistico.csv', index=False)
+                yield Entrega(
+                    centro_origem=melhor_centro,
+                    area_destino=area_id,
+                    criticidade=area.nivel_criticidade,
+                    pessoas_atendidas=int(area.pessoas_afetadas),
+                    agua=recursos_enviados['agua'],
+                    alimentos=recursos_enviados['alimentos'],
+                    medicamentos=recursos_enviados['medicamentos'],
+                    tempo_estimado_min=float(menor_tempo),
+                    rota=tuple(melhor_rota)
+                )
+    
+    def alocar_recursos_stream(self, formato='csv', arquivo=None, G=None, versao_rede=None,
+                               exibir_progresso=True):
+        """Gera o plano em fluxo, gravando cada entrega assim que é decidida.
+        
+        O plano é gravado incrementalmente em um arquivo temporário próprio
+        ('<arquivo>.<pid>.<thread>.parcial', no mesmo diretório), então
+        despachantes podem ler as primeiras entregas (as mais críticas) antes de
+        o plano terminar, e o uso de memória não depende do tamanho do plano. O
+        arquivo final só é substituído quando o fluxo é consumido até o fim (e a
+        rede não mudou desde versao_rede); um fluxo interrompido não deixa o
+        plano anterior truncado.
+        
+        Args:
+            formato (str): 'csv' ou 'jsonl'.
+            arquivo (str): Caminho do arquivo de saída. Padrão: plano_logistico.<formato>
+                no diretório de saída.
+            G (networkx.Graph): Grafo da rede a usar. Padrão: rede_logistica.pkl.
+            versao_rede (int): Versão da rede usada em G (uso interno da
+                reotimização). O arquivo não é substituído se a rede mudou depois.
+            exibir_progresso (bool): Imprime o início e o fim da alocação.
+            
+        Yields:
+            Entrega: Entregas na ordem em que são decididas.
+        """
+        escritores = {'csv': EscritorPlanoCSV, 'jsonl': EscritorPlanoJSONL}
+        if formato not in escritores:
+            raise ValueError(f"Formato de plano inválido: {formato}")
+        if arquivo is None:
+            arquivo = f'{self.output_dir}plano_logistico.{formato}'
+        
+        if exibir_progresso:
+            print("Iniciando alocação otimizada de recursos...")
+        # Um arquivo temporário por gravador: reotimização e chamada direta podem coexistir
+        parcial = f'{arquivo}.{os.getpid()}.{threading.get_ident()}.parcial'
+        total = 0
+        try:
+            with escritores[formato](parcial) as escritor:
+                for entrega in self.gerar_entregas(G):
+                    escritor.escrever(entrega)
+                    total += 1
+                    yield entrega
+        except BaseException:
+            # Fluxo abandonado ou com erro: mantém o plano anterior intacto
+            if os.path.exists(parcial):
+                os.remove(parcial)
+            raise
+        with self._lock:
+            if versao_rede is None or versao_rede == self._versao_rede:
+                os.replace(parcial, arquivo)
+            else:
+                os.remove(parcial)
+        
+        if exibir_progresso:
+            print(f"Plano logístico gerado para {total} áreas afetadas")
+    
+    def alocar_recursos(self, G=None, versao_rede=None, exibir_progresso=True):
+        """Aloca recursos para áreas afetadas otimizando rotas e prioridades.
+        
+        O plano e as alternativas são calculados em variáveis locais e só então
+        passam a ser o estado do alocador, de uma vez.
+        
+        Args:
+            G (networkx.Graph): Grafo da rede a usar. Padrão: rede_logistica.pkl.
+            versao_rede (int): Versão da rede usada em G (uso interno da
+                reotimização). O resultado é descartado se a rede mudou depois.
+            exibir_progresso (bool): Imprime o início e o fim da alocação.
+        
+        Returns:
+            list: Lista de entregas (Entrega) do plano de alocação.
+        """
+        if G is None:
+            G = self._carregar_rede()
+        plano_alocacao = list(self.alocar_recursos_stream(G=G, versao_rede=versao_rede,
+                                                          exibir_progresso=exibir_progresso))
+        
+        # Pré-calcular rotas alternativas para resposta imediata a bloqueios
+        alternativas = RouteAlternatives(k=self.num_alternativas)
+        alternativas.calcular(G, plano_alocacao)
+        
+        with self._lock:
+            if versao_rede is None or versao_rede == self._versao_rede:
+                self.G, self.alternativas, self.plano = G, alternativas, plano_alocacao
         
-        print(f"Plano logístico gerado para {len(plano_alocacao)} áreas afetadas")
         return plano_alocacao
     
+    def _reotimizar(self):
+        """Reotimiza o plano sobre uma cópia da rede vigente no início da execução."""
+        with self._lock:
+            G = self.G.copy()
+            versao = self._versao_rede
+        return self.alocar_recursos(G, versao, exibir_progresso=False)
+    
+    def aplicar_bloqueio(self, origem, destino):
+        """Responde ao bloqueio de uma via promovendo rotas alternativas pré-calculadas.
+        
+        As entregas afetadas passam imediatamente para a melhor alternativa ainda
+        válida, e a reotimização completa do plano é executada em segundo plano
+        sobre uma cópia da rede já sem a via. Bloqueios que chegam enquanto uma
+        reotimização ainda aguarda na fila são atendidos por ela; se outra via
+        for bloqueada durante a execução, o resultado mais antigo não substitui
+        o plano em uso nem o arquivo do plano.
+        
+        Args:
+            origem (str): Nó de uma extremidade da via bloqueada (ex.: 'A3').
+            destino (str): Nó da outra extremidade da via bloqueada.
+            
+        Returns:
+            concurrent.futures.Future: Reotimização em andamento, que resulta no novo plano.
+        """
+        if self.plano is None:
+            # Sem plano prévio não há alternativas: calcula o plano antes de bloquear
+            self.alocar_recursos()
+        
+        with self._lock:
+            if self.G.has_edge(origem, destino):
+                self.G.remove_edge(origem, destino)
+            
+            promovidas = self.alternativas.bloquear_aresta(origem, destino)
+            for i, entrega in enumerate(self.plano):
+                par = (entrega.centro_origem, entrega.area_destino)
+                if par not in promovidas:
+                    continue
+                if promovidas[par] is None:
+                    print(f"Sem rota alternativa para {par[0]} → {par[1]}; aguardando reotimização")
+                    continue
+                rota, tempo = promovidas[par]
+                self.plano[i] = entrega._replace(rota=tuple(rota), tempo_estimado_min=tempo)
+                print(f"Entrega {par[0]} → {par[1]} redirecionada: {' → '.join(rota)}")
+            
+            self._versao_rede += 1
+            # Uma reotimização que ainda não começou já verá a rede com este bloqueio
+            if self._reotimizacao is None or self._reotimizacao.running() or self._reotimizacao.done():
+                self._reotimizacao = self._executor.submit(self._reotimizar)
+            return self._reotimizacao
+    
     def exibir_resumo_plano(self, plano):
         """Exibe um resumo do plano de alocação gerado.
         
         Args:
-            plano (list): Lista com o plano de alocação.
+            plano (iterable): Plano de alocação (lista ou fluxo de entregas).
         """
         print("\nResumo do plano de alocação:")
-        for i, p in enumerate(plano[:5], 1):  # Mostrar primeiras 5 entregas
+        for i, p in enumerate(itertools.islice(plano, 5), 1):  # Mostrar primeiras 5 entregas
             print(f"\nEntrega {i}:")
-            print(f"  Centro: {p['centro_origem']} → Área: {p['area_destino']} (Criticidade: {p['criticidade']})")
-            print(f"  Recursos: Água: {p['recursos']['agua']}, Alimentos: {p['recursos']['alimentos']}, Medicamentos: {p['recursos']['medicamentos']}")
-            print(f"  Rota: {' → '.join(p['rota'])}")
-            print(f"  Tempo estimado: {p['tempo_estimado_min']:.1f} minutos")
+            print(f"  Centro: {p.centro_origem} → Área: {p.area_destino} (Criticidade: {p.criticidade})")
+            print(f"  Recursos: Água: {p.agua}, Alimentos: {p.alimentos}, Medicamentos: {p.medicamentos}")
+            print(f"  Rota: {' → '.join(p.rota)}")
+            print(f"  Tempo estimado: {p.tempo_estimado_min:.1f} minutos")
 
 # Exemplo de uso
 if __name__ == "__main__":
@@ -0,0 +1,222 @@
+import itertools
+import networkx as nx
+
+
+def chave_aresta(u, v):
+    """Chave de aresta independente da direção (o grafo da rede é não direcionado)."""
+    return (u, v) if u <= v else (v, u)
+
+
+class RouteAlternatives:
+    def __init__(self, k=3, sobreposicao_max=0.6, max_candidatos=10, pre_calculadas=50):
+        """Cache de rotas alternativas para as entregas planejadas.
+
+        Para cada par centro → área do plano são calculadas até K rotas sem
+        ciclos (algoritmo de Yen, via networkx.shortest_simple_paths), preferindo
+        rotas que compartilham poucas vias entre si. Quando uma via é bloqueada,
+        apenas as entregas que passam por ela são afetadas e a melhor alternativa
+        ainda válida é promovida imediatamente.
+
+        As alternativas são calculadas antecipadamente apenas para os primeiros
+        pares do plano (as entregas mais críticas); os demais guardam só a rota
+        planejada e têm as alternativas calculadas na primeira vez que um
+        bloqueio os atinge, para que o cache não domine o tempo de cada
+        replanejamento.
+
+        Args:
+            k (int): Número máximo de rotas mantidas por entrega.
+            sobreposicao_max (float): Fração máxima de vias em comum (índice de
+                Jaccard) entre uma nova alternativa e as já aceitas.
+            max_candidatos (int): Número máximo de caminhos examinados por entrega.
+            pre_calculadas (int): Número de pares, na ordem do plano, com alternativas
+                calculadas antecipadamente (None para todos).
+        """
+        self.k = k
+        self.sobreposicao_max = sobreposicao_max
+        self.max_candidatos = max_candidatos
+        self.pre_calculadas = pre_calculadas
+        self.G = None
+        # (origem, destino) -> {'rotas': [[custo, rota, arestas]], 'ativa': índice,
+        #                       'completa': alternativas já calculadas}
+        self.cache = {}
+        # aresta -> conjunto de pares (origem, destino) com alguma rota que a utiliza
+        self.indice_arestas = {}
+        self.bloqueadas = set()
+
+    def calcular(self, G, plano):
+        """Calcula as alternativas para todas as entregas de um plano.
+
+        Args:
+            G (networkx.Graph): Grafo da rede logística.
+            plano (list): Plano de alocação gerado por ResourceAllocator.
+        """
+        self.G = G
+        self.cache = {}
+        self.indice_arestas = {}
+        self.bloqueadas = set()
+        for entrega in plano:
+            par = (entrega.centro_origem, entrega.area_destino)
+            if par in self.cache:
+                continue
+            if self.pre_calculadas is None or len(self.cache) < self.pre_calculadas:
+                self.calcular_par(*par, entrega.rota)
+            else:
+                self._registrar_planejada(*par, entrega.rota)
+
+    def _custo(self, arestas_rota):
+        return sum(self.G[u][v]['weight'] for u, v in arestas_rota)
+
+    def calcular_par(self, origem, destino, rota_planejada=None):
+        """Calcula e indexa as alternativas de um par origem → destino.
+        
+        Args:
+            origem (str): Nó do centro de distribuição.
+            destino (str): Nó da área afetada.
+            rota_planejada (list): Rota do plano, mantida como primeira opção se
+                todas as suas vias ainda existirem no grafo.
+        """
+        self._remover_par(origem, destino)
+
+        candidatos = nx.shortest_simple_paths(self.G, origem, destino, weight='weight')
+        if rota_planejada is not None and all(
+                self.G.has_edge(u, v) for u, v in zip(rota_planejada[:-1], rota_planejada[1:])):
+            # A rota do plano é sempre a primeira opção
+            candidatos = itertools.chain([list(rota_planejada)], candidatos)
+
+        rotas = []
+        try:
+            for rota in itertools.islice(candidatos, self.max_candidatos):
+                arestas = list(zip(rota[:-1], rota[1:]))
+                conjunto = {chave_aresta(u, v) for u, v in arestas}
+                if any(r[1] == rota for r in rotas):
+                    continue
+                if all(len(conjunto & r[2]) / len(conjunto | r[2]) <= self.sobreposicao_max
+                       for r in rotas):
+                    rotas.append([self._custo(arestas), rota, conjunto])
+                if len(rotas) == self.k:
+                    break
+        except (nx.NetworkXNoPath, nx.NodeNotFound):
+            pass
+
+        rotas.sort(key=lambda r: r[0])
+        self._indexar(origem, destino, rotas, completa=True)
+
+    def _registrar_planejada(self, origem, destino, rota_planejada):
+        """Guarda apenas a rota do plano; as alternativas ficam para o primeiro bloqueio."""
+        arestas = list(zip(rota_planejada[:-1], rota_planejada[1:]))
+        if not all(self.G.has_edge(u, v) for u, v in arestas):
+            self.calcular_par(origem, destino, rota_planejada)
+            return
+        rota = list(rota_planejada)
+        self._indexar(origem, destino, [[self._custo(arestas), rota, {chave_aresta(u, v) for u, v in arestas}]],
+                      completa=False)
+
+    def _indexar(self, origem, destino, rotas, completa):
+        self.cache[(origem, destino)] = {'rotas': rotas, 'ativa': 0 if rotas else None,
+                                         'completa': completa}
+        for _, _, conjunto in rotas:
+            for aresta in conjunto:
+                self.indice_arestas.setdefault(aresta, set()).add((origem, destino))
+
+    def _remover_par(self, origem, destino):
+        entrada = self.cache.pop((origem, destino), None)
+        if entrada is None:
+            return
+        for _, _, conjunto in entrada['rotas']:
+            for aresta in conjunto:
+                pares = self.indice_arestas.get(aresta)
+                if pares is not None:
+                    pares.discard((origem, destino))
+
+    def _promover(self, par):
+        """Seleciona a rota válida de menor custo do par (no máximo K verificações)."""
+        entrada = self.cache[par]
+        entrada['ativa'] = next(
+            (i for i, r in enumerate(entrada['rotas']) if not (r[2] & self.bloqueadas)), None)
+        return self.rota_ativa(*par)
+
+    def rota_ativa(self, origem, destino):
+        """Rota atualmente escolhida para um par.
+
+        Args:
+            origem (str): Nó do centro de distribuição.
+            destino (str): Nó da área afetada.
+
+        Returns:
+            tuple: (rota, custo), ou None se não houver alternativa válida.
+        """
+        entrada = self.cache.get((origem, destino))
+        if entrada is None or entrada['ativa'] is None:
+            return None
+        custo, rota, _ = entrada['rotas'][entrada['ativa']]
+        return rota, custo
+
+    def bloquear_aresta(self, u, v):
+        """Registra o bloqueio de uma via e promove alternativas nas entregas afetadas.
+
+        Args:
+            u (str): Nó de uma extremidade da via.
+            v (str): Nó da outra extremidade da via.
+
+        Returns:
+            dict: (origem, destino) -> (rota, custo) ou None, apenas para as entregas
+                cuja rota ativa passava pela via bloqueada.
+        """
+        aresta = chave_aresta(u, v)
+        self.bloqueadas.add(aresta)
+
+        afetados = {}
+        for par in list(self.indice_arestas.get(aresta, ())):
+            ativa = self.rota_ativa(*par)
+            entrada = self.cache[par]
+            if ativa is not None and aresta in entrada['rotas'][entrada['ativa']][2]:
+                if not entrada['completa']:
+                    # Primeiro bloqueio que atinge o par: calcula as alternativas agora
+                    self.calcular_par(*par, ativa[0])
+                afetados[par] = self._promover(par)
+        return afetados
+
+    def liberar_aresta(self, u, v):
+        """Registra a liberação de uma via, revalidando as rotas que a utilizam.
+
+        Args:
+            u (str): Nó de uma extremidade da via.
+            v (str): Nó da outra extremidade da via.
+
+        Returns:
+            dict: (origem, destino) -> (rota, custo) das entregas cuja rota ativa mudou.
+        """
+        aresta = chave_aresta(u, v)
+        self.bloqueadas.discard(aresta)
+
+        alterados = {}
+        for par in self.indice_arestas.get(aresta, ()):
+            anterior = self.rota_ativa(*par)
+            atual = self._promover(par)
+            if atual != anterior:
+                alterados[par] = atual
+        return alterados
+
+    def atualizar_peso_aresta(self, u, v):
+        """Recalcula o custo das rotas que usam uma via cujo peso mudou no grafo.
+
+        Args:
+            u (str): Nó de uma extremidade da via.
+            v (str): Nó da outra extremidade da via.
+
+        Returns:
+            dict: (origem, destino) -> (rota, custo) das entregas afetadas.
+        """
+        aresta = chave_aresta(u, v)
+        if not self.G.has_edge(u, v):
+            return self.bloquear_aresta(u, v)
+
+        atualizados = {}
+        for par in self.indice_arestas.get(aresta, ()):
+            rotas = self.cache[par]['rotas']
+            for r in rotas:
+                if aresta in r[2] and not (r[2] & self.bloqueadas):
+                    r[0] = self._custo(zip(r[1][:-1], r[1][1:]))
+            rotas.sort(key=lambda r: r[0])
+            atualizados[par] = self._promover(par)
+        return atualizados
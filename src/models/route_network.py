@@ -5,6 +5,7 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import os
 import pickle  # Adicione esta importação
+from .travel_time_matrix import TravelTimeMatrix
 
 class RouteNetwork:
     def __init__(self, input_dir='src/data/', output_dir='src/data/'):
@@ -61,16 +62,14 @@ class RouteNetwork:
                           origem=rota['origem'],
                           destino=rota['destino'])
         
-        # Conectando centros às áreas mais próximas
+        # Conectando centros às áreas mais próximas (distâncias geodésicas pré-calculadas)
+        matriz = TravelTimeMatrix(input_dir=self.input_dir, output_dir=self.output_dir).construir()
         for _, centro in centros_df.iterrows():
-            centro_coord = (centro['longitude'], centro['latitude'])
+            centro_id = f"C{centro['id']}"
             # Encontra as 3 áreas mais próximas para conectar
-            for _, area in areas_df.head(3).iterrows():
-                area_coord = (area['longitude'], area['latitude'])
-                distancia = ((centro_coord[0] - area_coord[0])**2 + 
-                            (centro_coord[1] - area_coord[1])**2)**0.5 * 100  # Distância aproximada
-                G.add_edge(f"C{centro['id']}", f"A{area['id']}", 
-                          weight=distancia*2,  # Tempo estimado
+            for area_id, _ in matriz.mais_proximos(centro_id, k=3, tipo='area'):
+                G.add_edge(centro_id, area_id, 
+                          weight=matriz.tempo_estimado_min(centro_id, area_id),  # Tempo estimado
                           status='livre')
         
         # Salvando o grafo para uso posterior usando pickle
@@ -78,6 +77,9 @@ class RouteNetwork:
             pickle.dump(G, f)
         
         self.G = G
+        
+        # Tempos de viagem pela rede para uso das demais etapas
+        matriz.construir(G)
         print(f"Rede de rotas criada com {len(G.nodes())} nós e {len(G.edges())} conexões")
         return G
         
@@ -0,0 +1,235 @@
+import contextlib
+import glob
+import hashlib
+import json
+import os
+import threading
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+RAIO_TERRA_KM = 6371.0
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distância geodésica em km entre coordenadas em graus (vetorizada, com broadcasting)."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(a))
+
+
+class TravelTimeMatrix:
+    def __init__(self, input_dir='src/data/', output_dir='src/data/', velocidade_kmh=30,
+                 tamanho_bloco=1024, max_versoes=4):
+        """Matrizes de distância e tempo de viagem entre centros e áreas, compartilhadas entre etapas.
+
+        As matrizes são retangulares, com uma linha por centro e uma coluna por
+        área, pois todas as consultas partem de um centro ou chegam a um. As
+        distâncias geodésicas (haversine) são calculadas em blocos vetorizados
+        e os tempos de viagem pela rede (Dijkstra a partir de cada centro) são
+        armazenados como matrizes float32 mapeadas em memória. Uma tabela
+        combinada usa o tempo pela rede quando há caminho e a estimativa pela
+        distância e velocidade média nos demais pares, com uma máscara
+        indicando quais entradas vieram da rede. Os arquivos são
+        identificados pela versão da rede, então qualquer etapa reaproveita as
+        matrizes enquanto a rede não mudar.
+
+        Args:
+            input_dir (str): Diretório onde os dados de entrada estão armazenados.
+            output_dir (str): Diretório onde as matrizes serão salvas (subpasta matrizes/).
+            velocidade_kmh (float): Velocidade média usada nas estimativas sem rede.
+            tamanho_bloco (int): Número de centros (linhas) calculados por bloco.
+            max_versoes (int): Número de versões de matrizes de tempo mantidas em disco.
+        """
+        self.input_dir = input_dir
+        self.cache_dir = f'{output_dir}matrizes/'
+        self.velocidade_kmh = velocidade_kmh
+        self.tamanho_bloco = tamanho_bloco
+        self.max_versoes = max_versoes
+        self.centros = []
+        self.areas = []
+        self.indice_centros = {}
+        self.indice_areas = {}
+        self.distancia = None
+        self.tempo = None
+        self.tempo_combinado = None
+        self.via_rede = None
+        self.versao_rede = None
+        self._carregar_nos()
+
+    def _carregar_nos(self):
+        """Lê as coordenadas de centros e áreas na ordem usada pelas matrizes."""
+        areas_df = pd.read_csv(f'{self.input_dir}areas_afetadas_classificadas.csv')
+        centros_df = pd.read_csv(f'{self.input_dir}centros_distribuicao.csv')
+
+        self.centros = [f"C{i}" for i in centros_df['id']]
+        self.areas = [f"A{i}" for i in areas_df['id']]
+        self.indice_centros = {no: i for i, no in enumerate(self.centros)}
+        self.indice_areas = {no: j for j, no in enumerate(self.areas)}
+        self.lat_centros = centros_df['latitude'].to_numpy(dtype=np.float64)
+        self.lon_centros = centros_df['longitude'].to_numpy(dtype=np.float64)
+        self.lat_areas = areas_df['latitude'].to_numpy(dtype=np.float64)
+        self.lon_areas = areas_df['longitude'].to_numpy(dtype=np.float64)
+
+        coordenadas = hashlib.sha1(json.dumps([self.centros, self.areas]).encode())
+        for valores in (self.lat_centros, self.lon_centros, self.lat_areas, self.lon_areas):
+            coordenadas.update(valores.tobytes())
+        self.versao_coordenadas = coordenadas.hexdigest()[:12]
+
+    def _versao(self, G):
+        """Versão da rede: hash das coordenadas e das arestas com peso e status."""
+        h = hashlib.sha1(self.versao_coordenadas.encode())
+        arestas = sorted(
+            (min(u, v), max(u, v), float(d.get('weight', 0)), str(d.get('status', '')))
+            for u, v, d in G.edges(data=True)
+        )
+        h.update(json.dumps(arestas).encode())
+        return h.hexdigest()[:12]
+
+    def _abrir_ou_calcular(self, caminho, calcular, dtype=np.float32):
+        """Abre a matriz em disco ou a calcula e grava atomicamente."""
+        if not os.path.exists(caminho):
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temporario = f'{caminho}.{os.getpid()}.{threading.get_ident()}.tmp'
+            matriz = np.lib.format.open_memmap(temporario, mode='w+', dtype=dtype,
+                                                   shape=(len(self.centros), len(self.areas)))
+            calcular(matriz)
+            matriz.flush()
+            del matriz
+            os.replace(temporario, caminho)
+        return np.load(caminho, mmap_mode='r')
+
+    def _calcular_distancias(self, matriz):
+        for inicio in range(0, len(self.centros), self.tamanho_bloco):
+            fim = inicio + self.tamanho_bloco
+            matriz[inicio:fim] = haversine_km(self.lat_centros[inicio:fim, None],
+                                              self.lon_centros[inicio:fim, None],
+                                              self.lat_areas[None, :], self.lon_areas[None, :])
+
+    def _calcular_tempos(self, G, matriz):
+        for i, centro in enumerate(self.centros):
+            linha = np.full(len(self.areas), np.inf, dtype=np.float32)
+            if centro in G:
+                tempos = nx.single_source_dijkstra_path_length(G, centro, weight='weight')
+                for no, tempo in tempos.items():
+                    j = self.indice_areas.get(no)
+                    if j is not None:
+                        linha[j] = tempo
+            matriz[i] = linha
+
+    def _calcular_via_rede(self, matriz):
+        for inicio in range(0, len(self.centros), self.tamanho_bloco):
+            fim = inicio + self.tamanho_bloco
+            matriz[inicio:fim] = np.isfinite(self.tempo[inicio:fim])
+
+    def _calcular_tempo_combinado(self, matriz):
+        for inicio in range(0, len(self.centros), self.tamanho_bloco):
+            fim = inicio + self.tamanho_bloco
+            matriz[inicio:fim] = np.where(self.via_rede[inicio:fim], self.tempo[inicio:fim],
+                                          self.distancia[inicio:fim] * 60 / self.velocidade_kmh)
+
+    def _remover_versoes_antigas(self):
+        for prefixo in ('distancia', 'tempo', 'via_rede', 'combinado'):
+            # Outra instância (ex.: a reotimização em segundo plano) pode remover arquivos ao mesmo tempo
+            arquivos = []
+            for arquivo in glob.glob(f'{self.cache_dir}{prefixo}_*.npy'):
+                with contextlib.suppress(FileNotFoundError):
+                    arquivos.append((os.path.getmtime(arquivo), arquivo))
+            for _, arquivo in sorted(arquivos)[:-self.max_versoes]:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(arquivo)
+
+    def construir(self, G=None):
+        """Carrega ou calcula as matrizes para a rede atual.
+
+        Args:
+            G (networkx.Graph): Grafo da rede logística. Sem o grafo, apenas a
+                matriz de distâncias fica disponível; com ele, também as de tempo
+                pela rede, a combinada e a máscara via_rede.
+
+        Returns:
+            TravelTimeMatrix: A própria instância, para encadeamento.
+        """
+        self.distancia = self._abrir_ou_calcular(
+            f'{self.cache_dir}distancia_{self.versao_coordenadas}.npy', self._calcular_distancias)
+
+        if G is not None:
+            self.versao_rede = self._versao(G)
+            self.tempo = self._abrir_ou_calcular(
+                f'{self.cache_dir}tempo_{self.versao_rede}.npy',
+                lambda matriz: self._calcular_tempos(G, matriz))
+            self.via_rede = self._abrir_ou_calcular(
+                f'{self.cache_dir}via_rede_{self.versao_rede}.npy', self._calcular_via_rede, dtype=np.bool_)
+            self.tempo_combinado = self._abrir_ou_calcular(
+                f'{self.cache_dir}combinado_{self.versao_rede}_{self.velocidade_kmh:g}kmh.npy',
+                self._calcular_tempo_combinado)
+        self._remover_versoes_antigas()
+        return self
+
+    def _posicao(self, origem, destino):
+        """Linha e coluna de um par centro–área, em qualquer ordem (a rede não é direcionada)."""
+        if origem in self.indice_centros and destino in self.indice_areas:
+            return self.indice_centros[origem], self.indice_areas[destino]
+        if origem in self.indice_areas and destino in self.indice_centros:
+            return self.indice_centros[destino], self.indice_areas[origem]
+        raise KeyError(f"Par fora da matriz centros × áreas: {origem}, {destino}")
+
+    def distancia_km(self, origem, destino):
+        """Distância geodésica entre um centro e uma área, em km."""
+        return float(self.distancia[self._posicao(origem, destino)])
+
+    def tempo_min(self, origem, destino):
+        """Tempo de viagem pela rede entre um centro e uma área, em minutos (inf se não há caminho)."""
+        return float(self.tempo[self._posicao(origem, destino)])
+
+    def tempo_estimado_min(self, origem, destino):
+        """Tempo de viagem estimado pela distância geodésica e velocidade média."""
+        return self.distancia_km(origem, destino) * 60 / self.velocidade_kmh
+
+    def tempo_combinado_min(self, origem, destino):
+        """Tempo de viagem pela rede quando há caminho, senão a estimativa geodésica.
+
+        Returns:
+            tuple: (tempo em minutos, True se o tempo veio da rede).
+        """
+        i, j = self._posicao(origem, destino)
+        return float(self.tempo_combinado[i, j]), bool(self.via_rede[i, j])
+
+    def tempos_ate(self, destino, origens):
+        """Tempos de viagem pela rede de vários centros até uma área.
+
+        Args:
+            destino (str): Área de destino.
+            origens (list): Centros de origem.
+
+        Returns:
+            numpy.ndarray: Tempos em minutos na ordem de origens (inf se não há caminho).
+        """
+        linhas = [self.indice_centros[no] for no in origens]
+        return self.tempo[linhas, self.indice_areas[destino]]
+
+    def mais_proximos(self, no, k=3, tipo='area'):
+        """Áreas mais próximas (distância geodésica) de um centro, ou centros mais próximos de uma área.
+
+        Args:
+            no (str): Nó de referência.
+            k (int): Número de nós a retornar.
+            tipo (str): 'area' (para um centro) ou 'centro' (para uma área).
+
+        Returns:
+            list: Tuplas (no, distancia_km) em ordem crescente de distância.
+        """
+        if tipo == 'area' and no in self.indice_centros:
+            candidatos, distancias = self.areas, self.distancia[self.indice_centros[no]]
+        elif tipo == 'centro' and no in self.indice_areas:
+            candidatos, distancias = self.centros, self.distancia[:, self.indice_areas[no]]
+        else:
+            raise ValueError(f"Consulta fora da matriz centros × áreas: {no}, tipo {tipo}")
+        k = min(k, len(candidatos))
+        if k == 0:
+            return []
+        escolhidos = np.argpartition(distancias, k - 1)[:k]
+        escolhidos = escolhidos[np.argsort(distancias[escolhidos], kind='stable')]
+        return [(candidatos[i], float(distancias[i])) for i in escolhidos]